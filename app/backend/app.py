@@ -1,11 +1,10 @@
+import asyncio
 import os
-import socket
-import subprocess
+import signal
 import sys
 import threading
-import time
 import webbrowser
-from typing import Optional, Tuple
+from typing import Callable, Optional
 
 try:
     import webview
@@ -18,27 +17,45 @@ BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIR = os.path.normpath(os.path.join(BASE_DIR, "..", "frontend"))
 
 
-def start_flask_in_thread(host: str, port: int) -> threading.Thread:
-    thread = threading.Thread(
-        target=run_flask,
-        kwargs={"host": host, "port": port},
-        daemon=True,
-    )
+def start_flask_in_thread(host: str, port: int, on_exit: Optional[Callable[[], None]] = None) -> threading.Thread:
+    def _run():
+        try:
+            run_flask(host=host, port=port)
+        finally:
+            if on_exit is not None:
+                on_exit()
+
+    thread = threading.Thread(target=_run, daemon=True)
     thread.start()
     return thread
 
 
-def is_port_open(host: str, port: int) -> bool:
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
-        sock.settimeout(0.5)
+def _notify_loop(loop: asyncio.AbstractEventLoop, event: asyncio.Event) -> Callable[[], None]:
+    """Return a callback that sets ``event`` from any thread, ignoring an already-closed loop."""
+
+    def _notify():
         try:
-            sock.connect((host, port))
-            return True
-        except OSError:
-            return False
+            loop.call_soon_threadsafe(event.set)
+        except RuntimeError:
+            pass
+
+    return _notify
 
 
-def start_frontend_dev(host: str, port: int) -> Optional[subprocess.Popen]:
+async def is_port_open(host: str, port: int, timeout: float = 0.5) -> bool:
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(host, port), timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    try:
+        await writer.wait_closed()
+    except OSError:
+        pass
+    return True
+
+
+async def start_frontend_dev(host: str, port: int) -> Optional[asyncio.subprocess.Process]:
     if not os.path.isdir(FRONTEND_DIR):
         print(f"[frontend] Directory not found: {FRONTEND_DIR}")
         return None
@@ -46,7 +63,7 @@ def start_frontend_dev(host: str, port: int) -> Optional[subprocess.Popen]:
     cmd = ["npm", "run", "dev", "--", "--host", host, "--port", str(port), "--strictPort"]
     print(f"[frontend] Starting: {' '.join(cmd)} (cwd={FRONTEND_DIR})")
     try:
-        return subprocess.Popen(cmd, cwd=FRONTEND_DIR)
+        return await asyncio.create_subprocess_exec(*cmd, cwd=FRONTEND_DIR)
     except FileNotFoundError:
         print("[frontend] npm not found. Please install Node.js and npm.")
     except Exception as exc:  # pragma: no cover - runtime guardrail
@@ -54,12 +71,16 @@ def start_frontend_dev(host: str, port: int) -> Optional[subprocess.Popen]:
     return None
 
 
-def wait_for_port(host: str, port: int, timeout: float = 30.0) -> bool:
-    deadline = time.time() + timeout
-    while time.time() < deadline:
-        if is_port_open(host, port):
+async def wait_for_port(host: str, port: int, timeout: float = 30.0) -> bool:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+    delay = 0.05
+    while loop.time() < deadline:
+        if await is_port_open(host, port, timeout=max(0.05, min(0.5, deadline - loop.time()))):
             return True
-        time.sleep(0.5)
+        # Poll quickly at first, then back off so a slow start does not churn sockets.
+        await asyncio.sleep(max(0.0, min(delay, deadline - loop.time())))
+        delay = min(delay * 1.7, 0.5)
     return False
 
 
@@ -80,73 +101,100 @@ def open_webview(url: str):
         print(f"[browser] Failed to open URL automatically: {exc}")
 
 
-def stop_process(proc: subprocess.Popen, name: str = "process", timeout: float = 5.0):
+async def stop_process(proc: Optional[asyncio.subprocess.Process], name: str = "process", timeout: float = 5.0):
     if not proc:
         return
-    if proc.poll() is not None:
+    if proc.returncode is not None:
         return
     print(f"[{name}] Stopping...")
     try:
         proc.terminate()
         try:
-            proc.wait(timeout=timeout)
-        except subprocess.TimeoutExpired:
+            await asyncio.wait_for(proc.wait(), timeout)
+        except asyncio.TimeoutError:
             proc.kill()
+            await proc.wait()
+    except ProcessLookupError:
+        pass
     except Exception as exc:  # pragma: no cover - runtime guardrail
         print(f"[{name}] Failed to stop: {exc}")
 
 
-def main() -> int:
+async def amain() -> int:
     flask_host = os.getenv("FLASK_HOST", "127.0.0.1")
     flask_port = int(os.getenv("FLASK_PORT", "5000"))
     vite_host = os.getenv("VITE_HOST", "localhost")
     vite_port = int(os.getenv("VITE_PORT", "5173"))
 
+    loop = asyncio.get_running_loop()
+    flask_done = asyncio.Event()
+    stop_requested = asyncio.Event()
+
     print(f"[backend] Starting Flask on http://{flask_host}:{flask_port}")
-    flask_thread = start_flask_in_thread(flask_host, flask_port)
-
-    frontend_proc: Optional[subprocess.Popen] = None
-    frontend_running_before = is_port_open(vite_host, vite_port)
-    if frontend_running_before:
-        print(f"[frontend] Detected existing dev server at http://{vite_host}:{vite_port}, not starting a new one.")
-    else:
-        frontend_proc = start_frontend_dev(vite_host, vite_port)
-
-    # Wait briefly for servers to come up for a smoother user experience
-    if not wait_for_port(flask_host, flask_port, timeout=10):
-        print(f"[backend] Warning: Flask not reachable on {flask_host}:{flask_port} yet.")
-    if frontend_running_before or frontend_proc:
-        if wait_for_port(vite_host, vite_port, timeout=20):
-            print(f"[frontend] Dev server reachable at http://{vite_host}:{vite_port}")
+    start_flask_in_thread(flask_host, flask_port, on_exit=_notify_loop(loop, flask_done))
+
+    frontend_proc: Optional[asyncio.subprocess.Process] = None
+    exit_code = 0
+    try:
+        frontend_running_before = await is_port_open(vite_host, vite_port)
+        if frontend_running_before:
+            print(f"[frontend] Detected existing dev server at http://{vite_host}:{vite_port}, not starting a new one.")
         else:
-            print(f"[frontend] Warning: Vite not reachable on {vite_host}:{vite_port}. Check npm output above.")
+            frontend_proc = await start_frontend_dev(vite_host, vite_port)
+
+        # Wait briefly for servers to come up for a smoother user experience; both probes run concurrently.
+        probes = [wait_for_port(flask_host, flask_port, timeout=10)]
+        if frontend_running_before or frontend_proc:
+            probes.append(wait_for_port(vite_host, vite_port, timeout=20))
+        flask_ready, *frontend_ready = await asyncio.gather(*probes)
+        if not flask_ready:
+            print(f"[backend] Warning: Flask not reachable on {flask_host}:{flask_port} yet.")
+        if frontend_ready:
+            if frontend_ready[0]:
+                print(f"[frontend] Dev server reachable at http://{vite_host}:{vite_port}")
+            else:
+                print(f"[frontend] Warning: Vite not reachable on {vite_host}:{vite_port}. Check npm output above.")
+
+        print("\nApp ready:")
+        print(f"  Backend API: http://{flask_host}:{flask_port}")
+        print(f"  Frontend UI: http://{vite_host}:{vite_port}\n")
+        print("Press Ctrl+C to stop both.")
+
+        # Always open the Vite dev server in the webview. The GUI toolkit must own the main
+        # thread, so this blocks the loop; process-exit notifications queue up meanwhile.
+        open_webview(f"http://{vite_host}:{vite_port}")
 
-    print("\nApp ready:")
-    print(f"  Backend API: http://{flask_host}:{flask_port}")
-    print(f"  Frontend UI: http://{vite_host}:{vite_port}\n")
-    print("Press Ctrl+C to stop both.")
+        try:
+            loop.add_signal_handler(signal.SIGINT, stop_requested.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # Windows: Ctrl+C cancels asyncio.run() and surfaces as KeyboardInterrupt.
+
+        waiters = [asyncio.ensure_future(flask_done.wait()), asyncio.ensure_future(stop_requested.wait())]
+        if frontend_proc:
+            waiters.append(asyncio.ensure_future(frontend_proc.wait()))
+        _, pending = await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+        for waiter in pending:
+            waiter.cancel()
+
+        if frontend_proc and frontend_proc.returncode is not None:
+            print("[frontend] Dev server exited.")
+            exit_code = frontend_proc.returncode
+        elif flask_done.is_set():
+            print("[backend] Flask thread exited.")
+            exit_code = 1
+        else:
+            print("\nShutting down...")
+    finally:
+        await stop_process(frontend_proc, name="frontend")
+    return exit_code
 
-    # Always open the Vite dev server in the webview.
-    window_url = f"http://{vite_host}:{vite_port}"
 
-    exit_code = 0
+def main() -> int:
     try:
-        open_webview(window_url)
-        while True:
-            time.sleep(1)
-            if frontend_proc and frontend_proc.poll() is not None:
-                print("[frontend] Dev server exited.")
-                exit_code = frontend_proc.poll()
-                break
-            if flask_thread and not flask_thread.is_alive():
-                print("[backend] Flask thread exited.")
-                exit_code = 1
-                break
+        return asyncio.run(amain())
     except KeyboardInterrupt:
         print("\nShutting down...")
-    finally:
-        stop_process(frontend_proc, name="frontend")
-    return exit_code
+        return 0
 
 
 if __name__ == "__main__":
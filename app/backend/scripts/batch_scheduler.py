@@ -0,0 +1,70 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Callable, List, Sequence
+
+
+class BatchScheduler:
+    """
+    Coalesce items submitted from many threads into batches for a single worker.
+    A batch is flushed once max_batch items are waiting or max_wait seconds have
+    passed since its first item arrived, whichever comes first.
+    process_batch receives a list of items and must return one result per item.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[List[object]], Sequence[object]],
+        max_batch: int = 8,
+        max_wait: float = 0.01,
+        name: str = "batch-scheduler",
+    ):
+        self._process_batch = process_batch
+        self._max_batch = max(1, int(max_batch))
+        self._max_wait = max(0.0, float(max_wait))
+        self._name = name
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+
+    def submit(self, item) -> Future:
+        future: Future = Future()
+        self._ensure_worker()
+        self._queue.put((item, future))
+        return future
+
+    def _ensure_worker(self):
+        if self._thread is None:
+            with self._thread_lock:
+                if self._thread is None:
+                    thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                    thread.start()
+                    self._thread = thread
+
+    def _next_batch(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self._max_wait
+        while len(batch) < self._max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = [(item, future) for item, future in self._next_batch() if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            try:
+                results = list(self._process_batch([item for item, _ in batch]))
+                if len(results) != len(batch):
+                    raise RuntimeError(f"{self._name}: expected {len(batch)} results, got {len(results)}")
+            except Exception as exc:  # pragma: no cover - runtime guardrail
+                for _, future in batch:
+                    future.set_exception(exc)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
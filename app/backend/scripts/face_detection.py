@@ -1,26 +1,132 @@
 import os
-import tempfile
+import threading
 from typing import Dict, List, Union
 
 try:
     import cv2
+    import numpy as np
 except ImportError:  # pragma: no cover - optional dependency
     cv2 = None
+    np = None
 
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+DNN_PROTO_PATH = os.environ.get("FACE_DNN_PROTO", os.path.join(MODELS_DIR, "deploy.prototxt"))
+DNN_MODEL_PATH = os.environ.get(
+    "FACE_DNN_MODEL",
+    os.path.join(MODELS_DIR, "res10_300x300_ssd_iter_140000.caffemodel"),
+)
+DNN_INPUT_SIZE = (300, 300)
+DNN_MEAN = (104.0, 177.0, 123.0)
+DNN_MIN_CONFIDENCE = 0.5
+# Haar input is shrunk toward HAAR_MAX_SIDE on its longer side (0 disables), but never so far that a
+# face of HAAR_MIN_FACE original pixels falls below the cascade's detection window (24x24 for the
+# frontal-face model). The default HAAR_MIN_FACE equals that window, so images stay at full resolution.
+HAAR_MAX_SIDE = int(os.environ.get("HAAR_MAX_SIDE", "640"))
+HAAR_MIN_FACE = int(os.environ.get("HAAR_MIN_FACE", "24"))
 
-def _save_upload_to_temp(upload):
-    if not upload:
+_face_net_lock = threading.Lock()
+_face_net = None
+_face_net_checked = False
+
+_cascade_lock = threading.Lock()
+_cascade = None
+
+
+def configure_opencv() -> bool:
+    """
+    Apply the process-wide OpenCV settings face detection is tuned for: one worker
+    thread per core, the SIMD-dispatched code paths, and the OpenCL (T-API) kernels
+    when a device exists. These affect every OpenCV user in the process, so the
+    server calls this once at startup rather than on import.
+    Returns False when OpenCV is not installed.
+    """
+    if cv2 is None:
+        return False
+    cv2.setNumThreads(os.cpu_count() or 1)
+    cv2.setUseOptimized(True)
+    cv2.ocl.setUseOpenCL(cv2.ocl.haveOpenCL())
+    return True
+
+
+def _cuda_target():
+    """Return the OpenCV DNN CUDA target to use, or None when no CUDA device is usable."""
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() <= 0:
+            return None
+        info = cv2.cuda.DeviceInfo(0)
+        # Half precision needs compute capability 5.3 or newer.
+        if (info.majorVersion(), info.minorVersion()) >= (5, 3):
+            return cv2.dnn.DNN_TARGET_CUDA_FP16
+        return cv2.dnn.DNN_TARGET_CUDA
+    except (AttributeError, cv2.error):
         return None
-    _, ext = os.path.splitext(upload.filename or "")
-    suffix = ext if ext else ".png"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    upload.save(tmp.name)
-    return tmp.name
+
+
+def _get_face_net():
+    """
+    Lazily load the OpenCV DNN (ResNet-SSD) face detector once, guarded by a lock,
+    on the CUDA backend when OpenCV was built with it.
+    Returns None when the Caffe model files are missing so callers fall back to Haar.
+    """
+    global _face_net, _face_net_checked
+    if not _face_net_checked:
+        with _face_net_lock:
+            if not _face_net_checked:
+                if os.path.isfile(DNN_PROTO_PATH) and os.path.isfile(DNN_MODEL_PATH):
+                    net = cv2.dnn.readNetFromCaffe(DNN_PROTO_PATH, DNN_MODEL_PATH)
+                    target = _cuda_target()
+                    if target is not None:
+                        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                        net.setPreferableTarget(target)
+                    _face_net = net
+                _face_net_checked = True
+    return _face_net
+
+
+def _get_cascade():
+    """
+    Lazily build the frontal-face Haar cascade once and share it across requests.
+    The caller still checks empty() since a missing XML yields an empty classifier.
+    """
+    global _cascade
+    if _cascade is None:
+        with _cascade_lock:
+            if _cascade is None:
+                cascade_dir = getattr(cv2.data, "haarcascades", "")
+                cascade_path = os.path.join(cascade_dir, "haarcascade_frontalface_default.xml")
+                _cascade = cv2.CascadeClassifier(cascade_path)
+    return _cascade
+
+
+def _detect_faces_dnn(net, image, min_confidence=DNN_MIN_CONFIDENCE):
+    height, width = image.shape[:2]
+    blob = cv2.dnn.blobFromImage(image, 1.0, DNN_INPUT_SIZE, DNN_MEAN)
+    with _face_net_lock:
+        net.setInput(blob)
+        detections = net.forward()
+
+    detections = detections[0, 0]
+    detections = detections[detections[:, 2] > min_confidence]
+    corners = np.clip(detections[:, 3:7], 0.0, 1.0) * (width, height, width, height)
+    return [(x1, y1, x2 - x1, y2 - y1) for (x1, y1, x2, y2) in corners if x2 > x1 and y2 > y1]
+
+
+def _decode_upload(upload):
+    """
+    Decode an uploaded image straight from memory (no temp file).
+    Returns a BGR ndarray, or None when the data is empty or not an image.
+    """
+    data = upload.read()
+    if not data:
+        return None
+    return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
 
 
 def detect_faces(upload, scale_factor: float = 1.1, min_neighbors: int = 5) -> Dict[str, Union[int, bool, str, List[Dict[str, float]]]]:
     """
-    Detect faces in an uploaded image using OpenCV Haar cascades.
+    Detect faces in an uploaded image.
+    Uses the OpenCV DNN ResNet-SSD detector when its model files are present
+    (scale_factor/min_neighbors are then ignored), otherwise Haar cascades.
     Returns a response dict with keys:
       ok: bool
       status: HTTP-like status code
@@ -33,27 +139,34 @@ def detect_faces(upload, scale_factor: float = 1.1, min_neighbors: int = 5) -> D
     if not upload:
         return {"ok": False, "status": 400, "error": "missing-image"}
 
-    temp_path = _save_upload_to_temp(upload)
     try:
-        if not temp_path:
-            return {"ok": False, "status": 400, "error": "missing-image"}
-
-        image = cv2.imread(temp_path)
+        image = _decode_upload(upload)
         if image is None:
             return {"ok": False, "status": 400, "error": "invalid-image"}
 
-        cascade_dir = getattr(cv2.data, "haarcascades", "")
-        cascade_path = os.path.join(cascade_dir, "haarcascade_frontalface_default.xml")
-        face_cascade = cv2.CascadeClassifier(cascade_path)
-        if face_cascade.empty():
-            return {"ok": False, "status": 500, "error": "cascade-not-loaded"}
+        net = _get_face_net()
+        if net is not None:
+            faces = _detect_faces_dnn(net, image)
+        else:
+            face_cascade = _get_cascade()
+            if face_cascade.empty():
+                return {"ok": False, "status": 500, "error": "cascade-not-loaded"}
 
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = face_cascade.detectMultiScale(
-            gray,
-            scaleFactor=float(scale_factor) if scale_factor else 1.1,
-            minNeighbors=int(min_neighbors) if min_neighbors else 5,
-        )
+            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+            # Haar cost grows with pixel count; detect on a bounded copy and scale boxes back.
+            scale = min(1.0, HAAR_MAX_SIDE / max(gray.shape[:2])) if HAAR_MAX_SIDE > 0 else 1.0
+            min_scale = min(face_cascade.getOriginalWindowSize()) / max(HAAR_MIN_FACE, 1)
+            scale = min(1.0, max(scale, min_scale))
+            if scale < 1.0:
+                gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            # The shared classifier keeps per-call scratch state, so serialize detection on it.
+            with _cascade_lock:
+                faces = face_cascade.detectMultiScale(
+                    cv2.UMat(gray) if cv2.ocl.useOpenCL() else gray,
+                    scaleFactor=float(scale_factor) if scale_factor else 1.1,
+                    minNeighbors=int(min_neighbors) if min_neighbors else 5,
+                )
+            faces = [tuple(v / scale for v in face) for face in faces]
 
         boxes = [
             {
@@ -74,9 +187,3 @@ def detect_faces(upload, scale_factor: float = 1.1, min_neighbors: int = 5) -> D
             "error": "face-detection-failed",
             "message": str(exc),
         }
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
@@ -1,6 +1,54 @@
 import argparse
+import os
 import re
 import sys
+from array import array
+from functools import lru_cache
+
+try:
+    from rapidfuzz import process as rapidfuzz_process
+    from rapidfuzz.distance import Levenshtein
+except ImportError:  # pragma: no cover - optional dependency
+    rapidfuzz_process = None
+    Levenshtein = None
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+if Levenshtein is None and np is not None:
+    try:
+        from numba import njit
+    except ImportError:  # pragma: no cover - optional dependency
+        njit = None
+else:
+    njit = None
+
+try:
+    import re2
+except ImportError:  # pragma: no cover - optional dependency
+    re2 = None
+
+
+# Engine for the entity scanning patterns: "re" (default) is the stdlib; "re2" opts into RE2
+# when installed. RE2's \b, \d and \s are ASCII-only, so it misreads text with accented
+# letters or non-ASCII digits ("jürgen.müller@gmail.com" yields "ller@gmail.com").
+MYREGEX_BACKEND = os.environ.get("MYREGEX_BACKEND", "re").strip().lower()
+
+
+def _compile_scan_regex(pattern):
+    """
+    Compile a scanning pattern with RE2 (linear-time, no backtracking) when it is
+    installed and selected through MYREGEX_BACKEND=re2. Flags must be inline, e.g. (?i:...).
+    Otherwise, or if RE2 rejects the pattern, the stdlib re module is used.
+    """
+    if re2 is not None and MYREGEX_BACKEND == "re2":
+        try:
+            return re2.compile(pattern)
+        except re2.error:
+            pass
+    return re.compile(pattern)
 
 
 DATE_REGEXES = [
@@ -8,6 +56,9 @@ DATE_REGEXES = [
     re.compile(r"^(\d{4})[./-](0?[1-9]|1[0-2])[./-](0?[1-9]|[12][0-9]|3[01])$"),
 ]
 EMAIL_REGEX = re.compile(r"^[A-Z0-9._%+-]+@[A-Z0-9.-]+\.[A-Z]{2,}$", re.IGNORECASE)
+# Character sets of EMAIL_REGEX's local and domain parts, used to reject whole candidate families early.
+EMAIL_LOCAL_CHARS_REGEX = re.compile(r"[A-Z0-9._%+-]+", re.IGNORECASE)
+EMAIL_DOMAIN_CHARS_REGEX = re.compile(r"[A-Z0-9.-]+", re.IGNORECASE)
 IBAN_REGEX = re.compile(r"^[A-Z]{2}\d{2}[A-Z0-9]{11,30}$")
 PHONE_REGEX = re.compile(r"^(?:\+|0)[0-9][0-9\s().-]{5,}$")
 COMMON_TLDS = (
@@ -35,38 +86,57 @@ DATE_FIND_REGEXES = [
 ]
 EMAIL_FIND_REGEX = re.compile(r"\b[A-Z0-9._%+-]+\s*@\s*[A-Z0-9._-]+\s*[_\.]\s*[A-Z]{2,}\b", re.IGNORECASE)
 IBAN_FIND_REGEX = re.compile(r"\b[A-Z]{2}\s*[0-9O]{2}(?:\s*[A-Z0-9]){11,30}\b")
-PHONE_FIND_REGEX = re.compile(r"(?<!\w)(?:\+|0)\s*\d[\d\s().-]{5,}\d\b")
+# (?:\B\+|\b0) is the lookbehind-free form of (?<!\w)(?:\+|0), which RE2 can compile.
+PHONE_FIND_REGEX = re.compile(r"(?:\B\+|\b0)\s*\d[\d\s().-]{5,}\d\b")
+# Per-type scanners, compiled with the configured engine.
+ENTITY_FIND_REGEXES = {
+    "date": [_compile_scan_regex(regex.pattern) for regex in DATE_FIND_REGEXES],
+    "email": [_compile_scan_regex("(?i:{})".format(EMAIL_FIND_REGEX.pattern))],
+    "iban": [_compile_scan_regex(IBAN_FIND_REGEX.pattern)],
+    "phone": [_compile_scan_regex(PHONE_FIND_REGEX.pattern)],
+}
+SPACE_RUN_REGEX = re.compile(r"[ \t\r\n]+")
+WHITESPACE_REGEX = re.compile(r"\s+")
+NON_DIGIT_REGEX = re.compile(r"\D")
+EMAIL_AT_SPACING_REGEX = re.compile(r"\s*@\s*")
+EMAIL_DOT_SPACING_REGEX = re.compile(r"\s*\.\s*")
+EMAIL_UNDERSCORE_SPACING_REGEX = re.compile(r"\s*_\s*")
+EMAIL_TLD_UNDERSCORE_REGEX = re.compile(r"([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+)_([A-Za-z]{2,})$")
+DATE_SEPARATOR_SPACING_REGEX = re.compile(r"\s*([./-])\s*")
+# str.translate deletion tables for the ASCII fast path; they match \D and \s on ASCII input.
+NON_DIGIT_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if not chr(c).isdigit()))
+WHITESPACE_TABLE = str.maketrans("", "", "".join(chr(c) for c in range(128) if chr(c).isspace()))
+# ISO 13616 letter expansion for the mod-97 check: A -> "10", ..., Z -> "35".
+IBAN_LETTER_TABLE = str.maketrans({chr(ord("A") + i): str(10 + i) for i in range(26)})
 
 
 def normalize_spaces(text):
-    text = text.replace("\t", " ").replace("\r", " ").replace("\n", " ")
-    while "  " in text:
-        text = text.replace("  ", " ")
-    return text.strip()
+    return SPACE_RUN_REGEX.sub(" ", text).strip()
 
 
 def normalize_email(text):
     text = normalize_spaces(text)
-    text = re.sub(r"\s*@\s*", "@", text)
-    text = re.sub(r"\s*\.\s*", ".", text)
-    text = re.sub(r"\s*_\s*", "_", text)
-    text = re.sub(r"([A-Za-z0-9._%+-]+)@([A-Za-z0-9.-]+)_([A-Za-z]{2,})$", r"\1@\2.\3", text)
+    text = EMAIL_AT_SPACING_REGEX.sub("@", text)
+    text = EMAIL_DOT_SPACING_REGEX.sub(".", text)
+    text = EMAIL_UNDERSCORE_SPACING_REGEX.sub("_", text)
+    text = EMAIL_TLD_UNDERSCORE_REGEX.sub(r"\1@\2.\3", text)
     return text
 
 
 def normalize_date_token(text):
     text = normalize_spaces(text)
-    text = re.sub(r"\s*([./-])\s*", r"\1", text)
+    text = DATE_SEPARATOR_SPACING_REGEX.sub(r"\1", text)
     return text
 
 
 def normalize_phone(text):
     text = normalize_spaces(text)
-    return re.sub(r"\s+", " ", text)
+    return WHITESPACE_REGEX.sub(" ", text)
 
 
 def normalize_iban(text):
-    cleaned = re.sub(r"\s+", "", text.upper())
+    text = text.upper()
+    cleaned = text.translate(WHITESPACE_TABLE) if text.isascii() else WHITESPACE_REGEX.sub("", text)
     if len(cleaned) >= 4:
         check_digits = cleaned[2:4]
         if "O" in check_digits:
@@ -76,117 +146,194 @@ def normalize_iban(text):
 
 
 def digits_only(text):
-    return re.sub(r"\D", "", text)
+    if text.isascii():
+        return text.translate(NON_DIGIT_TABLE)
+    return NON_DIGIT_REGEX.sub("", text)
 
 
 def clamp_score(value):
     return max(0.0, min(1.0, value))
 
 
-def edit_distance(a, b):
+@lru_cache(maxsize=8192)
+def edit_distance(a, b, max_edits=None):
+    """
+    Levenshtein distance between a and b.
+    When max_edits is given, any distance above it is reported as max_edits + 1.
+    """
+    if Levenshtein is not None:
+        return Levenshtein.distance(a, b, score_cutoff=max_edits)
     if a == b:
         return 0
+    limit = max_edits + 1 if max_edits is not None else len(a) + len(b) + 1
+    if abs(len(a) - len(b)) >= limit:
+        return limit
     if not a:
         return len(b)
     if not b:
         return len(a)
+    if _edit_distance_nb is not None:
+        return int(_edit_distance_nb(_codepoints(a), _codepoints(b), limit))
 
-    rows = len(a) + 1
     cols = len(b) + 1
-    dp = [[0] * cols for _ in range(rows)]
-    for i in range(rows):
-        dp[i][0] = i
-    for j in range(cols):
-        dp[0][j] = j
-
-    for i in range(1, rows):
-        for j in range(1, cols):
-            cost = 0 if a[i - 1] == b[j - 1] else 1
-            dp[i][j] = min(
-                dp[i - 1][j] + 1,      # deletion
-                dp[i][j - 1] + 1,      # insertion
-                dp[i - 1][j - 1] + cost,  # substitution
+    band = limit - 1
+    prev = array("i", range(cols))
+    cur = array("i", [limit]) * cols
+    for i in range(1, len(a) + 1):
+        # Ukkonen band: cells with |i - j| > band cannot stay within the limit
+        lo = max(1, i - band)
+        hi = min(cols - 1, i + band)
+        cur[lo - 1] = i if lo == 1 else limit
+        row_min = cur[lo - 1]
+        ch = a[i - 1]
+        for j in range(lo, hi + 1):
+            cost = 0 if ch == b[j - 1] else 1
+            value = min(
+                prev[j] + 1,  # deletion
+                cur[j - 1] + 1,  # insertion
+                prev[j - 1] + cost,  # substitution
             )
-    return dp[-1][-1]
-
-
-def _add_email_candidate(candidates, candidate):
-    if EMAIL_REGEX.match(candidate):
-        candidates.add(candidate)
-
-
-def _add_domain_fixes(candidates, local, domain):
-    if not local or not domain:
+            cur[j] = value
+            if value < row_min:
+                row_min = value
+        if hi < cols - 1:
+            cur[hi + 1] = limit
+        if row_min >= limit:
+            return limit
+        prev, cur = cur, prev
+    return min(prev[-1], limit)
+
+
+if njit is not None:
+
+    @njit(cache=True)
+    def _edit_distance_nb(a, b, limit):
+        # Same banded rolling-row DP as edit_distance, over code point arrays.
+        cols = b.shape[0] + 1
+        band = limit - 1
+        prev = np.arange(cols).astype(np.int32)
+        cur = np.full(cols, limit, dtype=np.int32)
+        for i in range(1, a.shape[0] + 1):
+            lo = max(1, i - band)
+            hi = min(cols - 1, i + band)
+            cur[lo - 1] = i if lo == 1 else limit
+            row_min = cur[lo - 1]
+            ch = a[i - 1]
+            for j in range(lo, hi + 1):
+                cost = 0 if ch == b[j - 1] else 1
+                value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+                cur[j] = value
+                if value < row_min:
+                    row_min = value
+            if hi < cols - 1:
+                cur[hi + 1] = limit
+            if row_min >= limit:
+                return limit
+            prev, cur = cur, prev
+        return min(prev[cols - 1], limit)
+
+    def _codepoints(text):
+        return np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32)
+
+    # Compile at import (or load from the on-disk cache) instead of on the first request.
+    _edit_distance_nb(_codepoints("ab"), _codepoints("ba"), 3)
+else:
+    _edit_distance_nb = None
+
+
+def _domain_fixes(local, domain):
+    """
+    Yield the valid emails obtained by completing local@domain with a missing dot or TLD.
+    Every candidate shares local and domain, so their character sets are checked once up front.
+    """
+    if not local or not domain or not EMAIL_DOMAIN_CHARS_REGEX.fullmatch(domain):
         return
     if "." in domain:
-        _add_email_candidate(candidates, f"{local}@{domain}")
+        candidate = f"{local}@{domain}"
+        if EMAIL_REGEX.match(candidate):
+            yield candidate
     else:
         for i in range(1, len(domain)):
-            _add_email_candidate(candidates, f"{local}@{domain[:i]}.{domain[i:]}")
+            candidate = f"{local}@{domain[:i]}.{domain[i:]}"
+            if EMAIL_REGEX.match(candidate):
+                yield candidate
         for tld in COMMON_TLDS:
-            _add_email_candidate(candidates, f"{local}@{domain}.{tld}")
+            candidate = f"{local}@{domain}.{tld}"
+            if EMAIL_REGEX.match(candidate):
+                yield candidate
 
 
-def email_candidates(text):
-    candidates = set()
-    _add_email_candidate(candidates, text)
+def _split_fixes(local, domain):
+    yield from _domain_fixes(local, domain)
+    if "_" in domain:
+        yield from _domain_fixes(local, domain.replace("_", "."))
+        yield from _domain_fixes(local, domain.replace("_", ""))
+
+
+def _iter_email_candidates(text):
+    if EMAIL_REGEX.match(text):
+        yield text
 
     if "@" in text:
         local, _, domain = text.partition("@")
-        _add_domain_fixes(candidates, local, domain)
-        if "_" in domain:
-            _add_domain_fixes(candidates, local, domain.replace("_", "."))
-            _add_domain_fixes(candidates, local, domain.replace("_", ""))
-        return candidates
+        if EMAIL_LOCAL_CHARS_REGEX.fullmatch(local):
+            yield from _split_fixes(local, domain)
+        return
 
     for i in range(1, len(text)):
         local = text[:i]
-        domain = text[i:]
-        _add_domain_fixes(candidates, local, domain)
-        if "_" in domain:
-            _add_domain_fixes(candidates, local, domain.replace("_", "."))
-            _add_domain_fixes(candidates, local, domain.replace("_", ""))
+        if not EMAIL_LOCAL_CHARS_REGEX.fullmatch(local):
+            # Longer prefixes keep the offending character, so no later split can be valid.
+            break
+        yield from _split_fixes(local, text[i:])
 
-    return candidates
 
-
-def find_matches_for_type(text, entity_type):
-    matches = []
+def email_candidates(text):
+    """
+    Lazily yield each distinct valid email reachable from text by inserting an @,
+    a missing dot or a common TLD, or by repairing "_" in the domain.
+    """
+    seen = set()
+    for candidate in _iter_email_candidates(text):
+        if candidate not in seen:
+            seen.add(candidate)
+            yield candidate
+
+
+def _build_match(entity_type, raw, span):
     if entity_type == "date":
-        for regex in DATE_FIND_REGEXES:
-            for match in regex.finditer(text):
-                raw = match.group(0)
-                matches.append({"raw": raw, "normalized": normalize_date_token(raw), "span": match.span()})
-        return matches
+        return {"raw": raw, "normalized": normalize_date_token(raw), "span": span}
 
     if entity_type == "email":
-        for match in EMAIL_FIND_REGEX.finditer(text):
-            raw = match.group(0)
-            matches.append({"raw": raw, "normalized": normalize_email(raw), "span": match.span()})
-        return matches
+        return {"raw": raw, "normalized": normalize_email(raw), "span": span}
 
     if entity_type == "iban":
-        for match in IBAN_FIND_REGEX.finditer(text):
-            raw = match.group(0)
-            normalized = normalize_iban(raw)
-            if 12 <= len(normalized) <= 34:
-                matches.append({"raw": raw, "normalized": normalized, "span": match.span()})
-        return matches
+        normalized = normalize_iban(raw)
+        if 12 <= len(normalized) <= 34:
+            return {"raw": raw, "normalized": normalized, "span": span}
+        return None
 
     if entity_type == "phone":
-        for match in PHONE_FIND_REGEX.finditer(text):
-            raw = match.group(0)
-            normalized = normalize_phone(raw)
-            digit_count = len(digits_only(normalized))
-            if digit_count < 7 or digit_count > 15:
-                continue
-            if re.search(r"[A-Za-z]", normalized):
-                continue
-            if not re.search(r"[+()\s.-]", normalized) and digit_count > 10:
-                continue
-            matches.append({"raw": raw, "normalized": normalized, "span": match.span()})
-        return matches
+        normalized = normalize_phone(raw)
+        digit_count = len(digits_only(normalized))
+        if digit_count < 7 or digit_count > 15:
+            return None
+        if re.search(r"[A-Za-z]", normalized):
+            return None
+        if not re.search(r"[+()\s.-]", normalized) and digit_count > 10:
+            return None
+        return {"raw": raw, "normalized": normalized, "span": span}
+
+    return None
 
+
+def find_matches_for_type(text, entity_type):
+    matches = []
+    for regex in ENTITY_FIND_REGEXES.get(entity_type, ()):
+        for match in regex.finditer(text):
+            result = _build_match(entity_type, match.group(0), match.span())
+            if result is not None:
+                matches.append(result)
     return matches
 
 
@@ -194,15 +341,8 @@ def extract_entities(text):
     results = {"date": [], "iban": [], "phone": [], "email": []}
     for key in results.keys():
         matches = find_matches_for_type(text, key)
-        values = []
-        seen = set()
-        for match in matches:
-            value = match["normalized"]
-            if value in seen:
-                continue
-            seen.add(value)
-            values.append(value)
-        results[key] = values
+        # dict.fromkeys keeps first-seen order while dropping duplicates
+        results[key] = list(dict.fromkeys(match["normalized"] for match in matches))
     return results
 
 
@@ -244,16 +384,7 @@ def iban_checksum_ok(iban):
     if not IBAN_REGEX.match(iban):
         return False
     rearranged = iban[4:] + iban[:4]
-    converted = ""
-    for ch in rearranged:
-        if ch.isdigit():
-            converted += ch
-        else:
-            converted += str(ord(ch) - 55)
-    remainder = 0
-    for ch in converted:
-        remainder = (remainder * 10 + int(ch)) % 97
-    return remainder == 1
+    return int(rearranged.translate(IBAN_LETTER_TABLE)) % 97 == 1
 
 
 def score_iban(text):
@@ -297,19 +428,43 @@ def score_phone(text):
     return False, clamp_score(score)
 
 
+def _email_score_bound(cleaned, candidate):
+    """
+    Upper bound on score_email's 1 - edits / len(candidate) for one candidate.
+    Levenshtein is at least the length difference, and at least 1 because
+    cleaned itself is not a valid email (so it is never a candidate).
+    """
+    denom = max(len(candidate), 1)
+    return 1.0 - max(1, abs(len(candidate) - len(cleaned))) / denom
+
+
+@lru_cache(maxsize=4096)
 def score_email(text):
     cleaned = normalize_email(text)
     if EMAIL_REGEX.match(cleaned):
         return True, 1.0
 
-    candidates = email_candidates(cleaned)
+    candidates = list(email_candidates(cleaned))
     if not candidates:
         return False, 0.0
 
+    if rapidfuzz_process is not None and np is not None:
+        # Score every candidate in one batched C call instead of one distance per candidate.
+        edits = rapidfuzz_process.cdist([cleaned], candidates, scorer=Levenshtein.distance)[0]
+        lengths = np.fromiter(map(len, candidates), dtype=np.float64, count=len(candidates))
+        return False, clamp_score(float((1.0 - edits / np.maximum(lengths, 1.0)).max()))
+
     best_score = 0.0
-    for candidate in candidates:
-        edits = edit_distance(cleaned, candidate)
+    for bound, candidate in sorted(
+        ((_email_score_bound(cleaned, candidate), candidate) for candidate in candidates),
+        reverse=True,
+    ):
+        if bound <= best_score:
+            # Candidates are ordered by bound, so none of the rest can do better.
+            break
         denom = max(len(candidate), 1)
+        # Only distances that can still beat best_score need to be computed exactly.
+        edits = edit_distance(cleaned, candidate, max_edits=int((1.0 - best_score) * denom))
         score = 1.0 - (edits / denom)
         if score > best_score:
             best_score = score
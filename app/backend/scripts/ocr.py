@@ -1,14 +1,40 @@
+import bisect
 import os
-import tempfile
 import threading
 import warnings
 from typing import Dict, List, Union
 from . import myregex
+from .batch_scheduler import BatchScheduler
 
 try:
+    import cv2
     import easyocr
+    import numpy as np
 except ImportError:
+    cv2 = None
     easyocr = None
+    np = None
+
+try:
+    import torch
+except ImportError:  # pragma: no cover - optional dependency
+    torch = None
+
+def _env_flag(name, default=False):
+    value = os.environ.get(name)
+    if value is None or not value.strip():
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+OCR_FORCE_CPU = _env_flag("OCR_FORCE_CPU")
+# Dynamic int8 quantization of the detector/recognizer; EasyOCR only applies it on CPU.
+OCR_QUANTIZE = _env_flag("OCR_QUANTIZE", default=True)
+OCR_MODEL_DIR = os.environ.get("OCR_MODEL_DIR") or None
+OCR_WARMUP_SHAPE = (600, 800, 3)
+OCR_BATCH_SIZE = int(os.environ.get("OCR_BATCH_SIZE", "8"))
+OCR_BATCH_TIMEOUT_MS = float(os.environ.get("OCR_BATCH_TIMEOUT_MS", "10"))
+OCR_MAX_SIDE = int(os.environ.get("OCR_MAX_SIDE", "1600"))
 
 _reader_lock = threading.Lock()
 _reader = None
@@ -29,118 +55,242 @@ CANDIDATE_MIN_SCORE = {
 }
 
 
+def _gpu_available():
+    if OCR_FORCE_CPU or torch is None:
+        return False
+    if torch.cuda.is_available():
+        return True
+    mps = getattr(torch.backends, "mps", None)
+    return bool(mps and mps.is_available())
+
+
 def _get_reader():
     """
     Lazily instantiate the EasyOCR reader once, guarded by a lock.
-    GPU is disabled to avoid extra setup requirements.
+    Runs on CUDA/MPS when present (set OCR_FORCE_CPU=1 to opt out) and warms the
+    GPU up with a blank frame so cuDNN picks its kernels before the first request.
+    On CPU the models are int8-quantized unless OCR_QUANTIZE=0.
     """
     global _reader
     if _reader is None and easyocr is not None:
         with _reader_lock:
             if _reader is None:
+                use_gpu = _gpu_available()
                 with warnings.catch_warnings():
                     warnings.filterwarnings(
                         "ignore",
                         message=".*pin_memory.*",
                         category=UserWarning,
                     )
-                    _reader = easyocr.Reader(["en"], gpu=False, verbose=False)
+                    reader = easyocr.Reader(
+                        ["en"],
+                        gpu=use_gpu,
+                        model_storage_directory=OCR_MODEL_DIR,
+                        quantize=OCR_QUANTIZE,
+                        cudnn_benchmark=use_gpu,
+                        verbose=False,
+                    )
+                if use_gpu:
+                    reader.readtext(np.zeros(OCR_WARMUP_SHAPE, dtype=np.uint8))
+                _reader = reader
     return _reader
 
 
-def _save_upload_to_temp(upload):
+def preload_reader() -> bool:
+    """
+    Build the shared EasyOCR reader now rather than on the first request.
+    Returns False when easyocr is not installed.
+    """
+    return _get_reader() is not None
+
+
+def _pad_to_common_shape(images):
+    """
+    The batched detector needs equally sized images; pad bottom/right with black
+    instead of resizing so detected coordinates stay in each image's pixel space.
+    """
+    height = max(image.shape[0] for image in images)
+    width = max(image.shape[1] for image in images)
+    return [
+        np.pad(image, ((0, height - image.shape[0]), (0, width - image.shape[1])) + ((0, 0),) * (image.ndim - 2))
+        for image in images
+    ]
+
+
+def _readtext_batch(jobs):
+    """
+    Run EasyOCR over (rgb, grey, inverse_scale) jobs: one batched detector pass,
+    then recognition per image, and map each image's box corners back to the
+    resolution it was uploaded at.
+    This is readtext_batched split in two: given ndarrays, that derives the
+    recognizer's grayscale with COLOR_BGR2GRAY from the detector's RGB input,
+    which swaps the red and blue weights.
+    """
+    reader = _get_reader()
+    rgbs = _pad_to_common_shape([rgb for rgb, _, _ in jobs])
+    greys = _pad_to_common_shape([grey for _, grey, _ in jobs])
+    with _reader_lock:
+        horizontal_lists, free_lists = reader.detect(np.stack(rgbs), reformat=False)
+        batched = [
+            reader.recognize(grey, horizontal, free, detail=1, reformat=False)
+            for grey, horizontal, free in zip(greys, horizontal_lists, free_lists)
+        ]
+    results = []
+    for (_, _, inv_scale), detections in zip(jobs, batched):
+        if inv_scale != 1.0:
+            detections = [
+                ([[x * inv_scale, y * inv_scale] for x, y in bbox], *rest)
+                for bbox, *rest in detections
+            ]
+        results.append(detections)
+    return results
+
+
+_ocr_scheduler = BatchScheduler(
+    _readtext_batch,
+    max_batch=OCR_BATCH_SIZE,
+    max_wait=OCR_BATCH_TIMEOUT_MS / 1000.0,
+    name="ocr-batch",
+)
+
+
+def _submit_readtext(image):
+    """
+    Queue one decoded BGR image for the shared OCR batch worker.
+    Returns a Future resolving to its detections ([bbox, text, confidence]
+    triples, as readtext(detail=1) returns) in the image's own pixel space.
+    """
+    # Detection cost grows with pixel count; OCR a bounded copy and scale boxes back.
+    scale = min(1.0, OCR_MAX_SIDE / max(image.shape[:2])) if OCR_MAX_SIDE > 0 else 1.0
+    if scale < 1.0:
+        image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    # Same inputs EasyOCR derives from a file path: RGB for the detector, and the
+    # recognizer's grayscale converted from BGR (as cv2.imread(..., IMREAD_GRAYSCALE) does).
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    grey = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    return _ocr_scheduler.submit((rgb, grey, 1.0 / scale))
+
+
+def _readtext(image):
+    return _submit_readtext(image).result()
+
+
+def _decode_upload_to_array(upload):
+    """
+    Decode an uploaded image straight from memory (no temp file).
+    Returns a BGR ndarray, or None when the data is empty or not an image.
+    """
     if not upload:
         return None
-    _, ext = os.path.splitext(upload.filename or "")
-    suffix = ext if ext else ".png"
-    tmp = tempfile.NamedTemporaryFile(delete=False, suffix=suffix)
-    upload.save(tmp.name)
-    return tmp.name
-
-
-def _bbox_metrics(bbox):
-    xs = [pt[0] for pt in bbox]
-    ys = [pt[1] for pt in bbox]
-    min_x, max_x = min(xs), max(xs)
-    min_y, max_y = min(ys), max(ys)
-    height = max_y - min_y
-    return {
-        "min_x": min_x,
-        "max_x": max_x,
-        "min_y": min_y,
-        "max_y": max_y,
-        "height": height,
-    }
-
-
-def _overlap_ratio(line_box, item_box):
-    overlap = max(0.0, min(line_box["max_y"], item_box["max_y"]) - max(line_box["min_y"], item_box["min_y"]))
-    denom = min(line_box["height"], item_box["height"]) or 1.0
-    return overlap / denom
-
-
-def _group_items_into_lines(items, y_overlap_thresh=0.5):
+    data = upload.read()
+    if not data:
+        return None
+    try:
+        return cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    except cv2.error:
+        # Corrupt headers (e.g. dimensions above CV_IO_MAX_IMAGE_PIXELS) raise instead of returning None.
+        return None
+
+
+def _bbox_extents(bboxes):
+    """
+    Axis-aligned extents for a batch of 4-point quads in one NumPy pass.
+    Returns an (N, 4) float64 array of [min_x, min_y, max_x, max_y] rows.
+    """
+    if not bboxes:
+        return np.empty((0, 4), dtype=np.float64)
+    points = np.asarray(bboxes, dtype=np.float64)[:, :4, :2]
+    return np.concatenate((points.min(axis=1), points.max(axis=1)), axis=1)
+
+
+def _group_items_into_lines(boxes, y_overlap_thresh=0.5):
+    """
+    Group token boxes ((N, 4) [min_x, min_y, max_x, max_y] rows) into text lines.
+    Returns one list of token indices per line, left-to-right, with lines ordered
+    top-to-bottom, left-to-right.
+    """
+    # Stable (min_y, min_x) order, so ties keep detection order.
+    order = np.lexsort((boxes[:, 0], boxes[:, 1])).tolist()
+    rows = boxes.tolist()
     lines = []
-    for item in sorted(items, key=lambda it: (it["box"]["min_y"], it["box"]["min_x"])):
+    # Lines that can still overlap upcoming items, in creation order. Each entry is
+    # (indices, [min_x, min_y, max_x, max_y]).
+    active = []
+    for idx in order:
+        item_min_x, min_y, item_max_x, max_y = rows[idx]
+        item_height = max_y - min_y
+        # Items arrive by min_y, so a line ending at or above this one overlaps no later item either.
+        active = [entry for entry in active if entry[1][3] > min_y]
+
         matched = None
         best_ratio = 0.0
-        for line in lines:
-            ratio = _overlap_ratio(line["box"], item["box"])
+        for entry in active:
+            box = entry[1]
+            overlap = max(0.0, min(box[3], max_y) - max(box[1], min_y))
+            ratio = overlap / (min(box[3] - box[1], item_height) or 1.0)
             if ratio > best_ratio:
                 best_ratio = ratio
-                matched = line
+                matched = entry
         if matched and best_ratio >= y_overlap_thresh:
-            matched["items"].append(item)
-            matched["box"]["min_y"] = min(matched["box"]["min_y"], item["box"]["min_y"])
-            matched["box"]["max_y"] = max(matched["box"]["max_y"], item["box"]["max_y"])
-            matched["box"]["height"] = matched["box"]["max_y"] - matched["box"]["min_y"]
-            matched["box"]["min_x"] = min(matched["box"]["min_x"], item["box"]["min_x"])
-            matched["box"]["max_x"] = max(matched["box"]["max_x"], item["box"]["max_x"])
+            matched[0].append(idx)
+            box = matched[1]
+            box[0] = min(box[0], item_min_x)
+            box[1] = min(box[1], min_y)
+            box[2] = max(box[2], item_max_x)
+            box[3] = max(box[3], max_y)
         else:
-            lines.append({"items": [item], "box": dict(item["box"])})
+            entry = ([idx], [item_min_x, min_y, item_max_x, max_y])
+            lines.append(entry)
+            active.append(entry)
 
-    for line in lines:
-        line["items"].sort(key=lambda it: it["box"]["min_x"])
+    lines.sort(key=lambda entry: (entry[1][1], entry[1][0]))
+    return [sorted(indices, key=lambda i: rows[i][0]) for indices, _ in lines]
 
-    lines.sort(key=lambda ln: (ln["box"]["min_y"], ln["box"]["min_x"]))
-    return lines
 
-
-def _line_text_and_offsets(tokens):
+def _line_text_and_offsets(texts, indices):
+    """
+    Join a line's token texts with single spaces.
+    Returns (text, offsets, ends): offsets holds (start, end, token_index) per token,
+    left to right, and ends its end positions for bisecting in _token_indices_for_span.
+    """
     parts = []
     offsets = []
+    ends = []
     pos = 0
-    for idx, token in enumerate(tokens):
+    for idx in indices:
         if parts:
             parts.append(" ")
             pos += 1
         start = pos
-        text = token["text"]
+        text = texts[idx]
         parts.append(text)
         pos += len(text)
         offsets.append((start, pos, idx))
-    return "".join(parts), offsets
+        ends.append(pos)
+    return "".join(parts), offsets, ends
 
 
-def _token_indices_for_span(offsets, start, end):
+def _token_indices_for_span(offsets, ends, start, end):
+    # Tokens are disjoint and ordered, so the first overlapping one is the first ending after start.
     indices = []
-    for token_start, token_end, idx in offsets:
-        if token_end > start and token_start < end:
-            indices.append(idx)
+    for i in range(bisect.bisect_right(ends, start), len(offsets)):
+        token_start, _, idx = offsets[i]
+        if token_start >= end:
+            break
+        indices.append(idx)
     return indices
 
 
-def _merge_boxes(tokens):
-    min_x = min(token["box"]["min_x"] for token in tokens)
-    min_y = min(token["box"]["min_y"] for token in tokens)
-    max_x = max(token["box"]["max_x"] for token in tokens)
-    max_y = max(token["box"]["max_y"] for token in tokens)
+def _merge_boxes(boxes, indices):
+    selected = boxes[indices]
+    min_x, min_y = selected[:, :2].min(axis=0).tolist()
+    max_x, max_y = selected[:, 2:].max(axis=0).tolist()
     return {"min_x": min_x, "min_y": min_y, "max_x": max_x, "max_y": max_y}
 
 
 def _dedupe_results(results):
-    seen = set()
-    unique = []
+    # dict keeps insertion order, so setdefault leaves the first result per key in place.
+    unique = {}
     for result in results:
         box = result["box"]
         key = (
@@ -150,49 +300,102 @@ def _dedupe_results(results):
             round(box["max_x"], 1),
             round(box["max_y"], 1),
         )
-        if key in seen:
-            continue
-        seen.add(key)
-        unique.append(result)
-    return unique
+        unique.setdefault(key, result)
+    return list(unique.values())
 
 
-def _locate_entities_in_lines(lines, entity_type, min_score=None, require_valid=False):
+def _locate_entities_in_lines(lines, texts, boxes, confs, min_scores=None, require_valid=False):
+    """
+    Find every entity type in each line, tokenizing the line once for all types.
+    Each type is scanned on its own (myregex.find_matches_for_type), so overlapping
+    hits of different types, like a phone inside an IBAN, are all reported.
+    lines holds token-index lists into texts/boxes/confs (see _group_items_into_lines).
+    min_scores maps entity type -> minimum score. Results are grouped in ENTITY_TYPES
+    order and, within a type, deduplicated and sorted top-to-bottom, left-to-right.
+    """
+    min_scores = min_scores or {}
+    results_by_type = {entity_type: [] for entity_type in ENTITY_TYPES}
+    for indices in lines:
+        line_text, offsets, ends = _line_text_and_offsets(texts, indices)
+        for entity_type in ENTITY_TYPES:
+            min_score = min_scores.get(entity_type)
+            for match in myregex.find_matches_for_type(line_text, entity_type):
+                value = match["normalized"]
+                is_match, score = myregex.score_entity(entity_type, value)
+                if min_score is not None and score < min_score:
+                    continue
+                if require_valid and not myregex.is_valid_entity(entity_type, value):
+                    continue
+                start, end = match["span"]
+                token_indices = _token_indices_for_span(offsets, ends, start, end)
+                if not token_indices:
+                    continue
+                box = _merge_boxes(boxes, token_indices)
+                conf = sum(confs[idx] for idx in token_indices) / len(token_indices)
+                results_by_type[entity_type].append(
+                    {
+                        "value": value,
+                        "raw": match["raw"],
+                        "box": box,
+                        "conf": conf,
+                        "score": score,
+                        "match": is_match,
+                        "type": entity_type,
+                    }
+                )
+
     results = []
-    for line in lines:
-        tokens = line["items"]
-        line_text, offsets = _line_text_and_offsets(tokens)
-        matches = myregex.find_matches_for_type(line_text, entity_type)
-        for match in matches:
-            value = match["normalized"]
-            is_match, score = myregex.score_entity(entity_type, value)
-            if min_score is not None and score < min_score:
-                continue
-            if require_valid and not myregex.is_valid_entity(entity_type, value):
-                continue
-            start, end = match["span"]
-            token_indices = _token_indices_for_span(offsets, start, end)
-            if not token_indices:
-                continue
-            selected = [tokens[idx] for idx in token_indices]
-            box = _merge_boxes(selected)
-            conf = sum(item["conf"] for item in selected) / len(selected)
-            results.append(
-                {
-                    "value": value,
-                    "raw": match["raw"],
-                    "box": box,
-                    "conf": conf,
-                    "score": score,
-                    "match": is_match,
-                    "type": entity_type,
-                }
-            )
-    results = _dedupe_results(results)
-    results.sort(key=lambda item: (item["box"]["min_y"], item["box"]["min_x"]))
+    for entity_type in ENTITY_TYPES:
+        typed = _dedupe_results(results_by_type[entity_type])
+        typed.sort(key=lambda item: (item["box"]["min_y"], item["box"]["min_x"]))
+        results.extend(typed)
     return results
 
 
+def _boxes_from_detections(detections):
+    # Tokens are kept as parallel columns: texts[i], confs[i] and boxes[i] describe one detection.
+    texts = []
+    confs = []
+    quads = []
+    for det in detections:
+        if not det or len(det) < 2:
+            continue
+        coords, text = det[0], det[1]
+        conf = det[2] if len(det) > 2 else None
+        cleaned = str(text).strip() if text is not None else ""
+        if not cleaned:
+            continue
+        if coords is None or len(coords) < 4:
+            continue
+        texts.append(cleaned)
+        confs.append(float(conf) if conf is not None else 0.0)
+        quads.append(coords[:4])
+    boxes = _bbox_extents(quads)
+
+    lines = _group_items_into_lines(boxes, y_overlap_thresh=0.5)
+    results = _locate_entities_in_lines(
+        lines, texts, boxes, confs, min_scores=CANDIDATE_MIN_SCORE, require_valid=False
+    )
+
+    output = []
+    for result in results:
+        box = result["box"]
+        width = max(0.0, box["max_x"] - box["min_x"])
+        height = max(0.0, box["max_y"] - box["min_y"])
+        output.append(
+            {
+                "x": float(box["min_x"]),
+                "y": float(box["min_y"]),
+                "width": float(width),
+                "height": float(height),
+                "text": result["value"],
+                "confidence": float(result["conf"]),
+                "category": CATEGORY_MAP[result["type"]],
+            }
+        )
+    return output
+
+
 def _load_reader_or_error():
     reader = _get_reader()
     if reader is None:
@@ -219,19 +422,19 @@ def read_text_from_upload(upload) -> Dict[str, Union[int, bool, str, List[str]]]
     if upload.filename == "":
         return {"ok": False, "status": 400, "error": "empty-image"}
 
-    temp_path = _save_upload_to_temp(upload)
     try:
-        if not temp_path:
-            return {"ok": False, "status": 400, "error": "missing-image"}
+        image = _decode_upload_to_array(upload)
+        if image is None:
+            return {"ok": False, "status": 400, "error": "invalid-image"}
 
         reader = _load_reader_or_error()
         if not isinstance(reader, easyocr.Reader):
             return reader
 
-        with _reader_lock:
-            detected_lines: List[str] = reader.readtext(temp_path, detail=0)
+        detected_lines: List[str] = [det[1] for det in _readtext(image)]
 
-        text = "\n".join(line.strip() for line in detected_lines if str(line).strip())
+        stripped = [line for line in (str(raw).strip() for raw in detected_lines) if line]
+        text = "\n".join(stripped)
         return {
             "ok": True,
             "status": 200,
@@ -245,12 +448,6 @@ def read_text_from_upload(upload) -> Dict[str, Union[int, bool, str, List[str]]]
             "error": "ocr-failed",
             "message": str(exc),
         }
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
 
 
 def read_text_boxes(upload) -> Dict[str, Union[int, bool, str, List[Dict[str, Union[str, float]]]]]:
@@ -266,67 +463,36 @@ def read_text_boxes(upload) -> Dict[str, Union[int, bool, str, List[Dict[str, Un
     if not upload:
         return {"ok": False, "status": 400, "error": "missing-image"}
 
-    temp_path = _save_upload_to_temp(upload)
     try:
-        if not temp_path:
-            return {"ok": False, "status": 400, "error": "missing-image"}
+        image = _decode_upload_to_array(upload)
+        if image is None:
+            return {"ok": False, "status": 400, "error": "invalid-image"}
 
         reader = _load_reader_or_error()
         if not isinstance(reader, easyocr.Reader):
             return reader
 
-        with _reader_lock:
-            detections = reader.readtext(temp_path, detail=1)
-
-        items = []
-        for det in detections:
-            if not det or len(det) < 2:
-                continue
-            coords, text = det[0], det[1]
-            conf = det[2] if len(det) > 2 else None
-            cleaned = str(text).strip() if text is not None else ""
-            if not cleaned:
-                continue
-            if not coords or len(coords) < 4:
-                continue
-            items.append(
-                {
-                    "text": cleaned,
-                    "conf": float(conf) if conf is not None else 0.0,
-                    "box": _bbox_metrics(coords),
-                }
-            )
-
-        lines = _group_items_into_lines(items, y_overlap_thresh=0.5)
-        results = []
-        for entity_type in ENTITY_TYPES:
-            results.extend(
-                _locate_entities_in_lines(
-                    lines,
-                    entity_type,
-                    min_score=CANDIDATE_MIN_SCORE.get(entity_type),
-                    require_valid=False,
-                )
-            )
+        boxes = _boxes_from_detections(_readtext(image))
+        return {"ok": True, "status": 200, "boxes": boxes}
+    except Exception as exc:  # pragma: no cover - runtime guardrail
+        return {
+            "ok": False,
+            "status": 500,
+            "error": "ocr-boxes-failed",
+            "message": str(exc),
+        }
 
-        boxes = []
-        for result in results:
-            box = result["box"]
-            width = max(0.0, box["max_x"] - box["min_x"])
-            height = max(0.0, box["max_y"] - box["min_y"])
-            boxes.append(
-                {
-                    "x": float(box["min_x"]),
-                    "y": float(box["min_y"]),
-                    "width": float(width),
-                    "height": float(height),
-                    "text": result["value"],
-                    "confidence": float(result["conf"]),
-                    "category": CATEGORY_MAP[result["type"]],
-                }
-            )
 
-        return {"ok": True, "status": 200, "boxes": boxes}
+def _submit_upload(upload):
+    """
+    Decode one upload of a batch and queue it for OCR.
+    Returns the Future from _submit_readtext, or a read_text_boxes-style error dict.
+    """
+    try:
+        image = _decode_upload_to_array(upload)
+        if image is None:
+            return {"ok": False, "status": 400, "error": "invalid-image"}
+        return _submit_readtext(image)
     except Exception as exc:  # pragma: no cover - runtime guardrail
         return {
             "ok": False,
@@ -334,9 +500,40 @@ def read_text_boxes(upload) -> Dict[str, Union[int, bool, str, List[Dict[str, Un
             "error": "ocr-boxes-failed",
             "message": str(exc),
         }
-    finally:
-        if temp_path and os.path.exists(temp_path):
-            try:
-                os.remove(temp_path)
-            except OSError:
-                pass
+
+
+def read_text_boxes_batch(uploads) -> Dict[str, Union[int, bool, str, List[Dict[str, object]]]]:
+    """
+    Run read_text_boxes over several uploads in one call.
+    All images are queued together so the OCR worker detects them as one batch.
+    Returns ok/status plus results: one read_text_boxes-style dict per upload, in order.
+    """
+    if easyocr is None:
+        return {"ok": False, "status": 500, "error": "easyocr-not-installed"}
+
+    if not uploads:
+        return {"ok": False, "status": 400, "error": "missing-image"}
+
+    reader = _load_reader_or_error()
+    if not isinstance(reader, easyocr.Reader):
+        return reader
+
+    # One bad upload only fails its own entry, never the whole batch.
+    pending = [_submit_upload(upload) for upload in uploads]
+    results = []
+    for future in pending:
+        if isinstance(future, dict):
+            results.append(future)
+            continue
+        try:
+            results.append({"ok": True, "status": 200, "boxes": _boxes_from_detections(future.result())})
+        except Exception as exc:  # pragma: no cover - runtime guardrail
+            results.append(
+                {
+                    "ok": False,
+                    "status": 500,
+                    "error": "ocr-boxes-failed",
+                    "message": str(exc),
+                }
+            )
+    return {"ok": True, "status": 200, "results": results}
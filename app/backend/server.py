@@ -1,27 +1,52 @@
 import os
 from flask import Flask, send_from_directory, jsonify, request
 from flask_cors import CORS
+from werkzeug.exceptions import NotFound, RequestEntityTooLarge
 
-from scripts.ocr import read_text_from_upload, read_text_boxes
-from scripts.face_detection import detect_faces
+try:
+    from waitress import serve as waitress_serve
+except ImportError:  # pragma: no cover - optional dependency
+    waitress_serve = None
+
+from scripts.ocr import preload_reader, read_text_from_upload, read_text_boxes, read_text_boxes_batch
+from scripts.face_detection import configure_opencv, detect_faces
 
 # --- Paths ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 FRONTEND_DIST = os.path.join(BASE_DIR, "..", "frontend", "dist")
-
-app = Flask(
-    __name__,
-    static_folder=FRONTEND_DIST,
-    static_url_path=""
-)
+# Vite emits content-hashed filenames under assets/, so they can be cached forever.
+HASHED_ASSETS_PREFIX = "assets/"
+HASHED_ASSETS_MAX_AGE = 31536000
+MAX_UPLOAD_MB = int(os.environ.get("MAX_UPLOAD_MB", "20"))
+WEB_THREADS = int(os.environ.get("WEB_THREADS", "8"))
+
+# static_proxy serves the dist folder itself; Flask's own static route would shadow it.
+app = Flask(__name__, static_folder=None)
+# Reject oversized request bodies before they are parsed; file parts above
+# Werkzeug's 500 KB threshold are spooled to disk rather than kept in memory.
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_MB * 1024 * 1024
 cors = CORS(app, resources={r"/api/*": {"origins": "*"}})
 
+# Process-wide OpenCV threading/SIMD/OpenCL settings, applied once for the whole server.
+configure_opencv()
+
+# Load the OCR models at import time, e.g. once in a pre-forking server's master process.
+if os.environ.get("PRELOAD_OCR", "").strip().lower() in ("1", "true", "yes", "on"):
+    preload_reader()
+
 
 # --- React static files ---
 @app.route("/")
 def index():
     # Serve the main React HTML file (built assets expected in dist)
-    return send_from_directory(FRONTEND_DIST, "index.html")
+    return _send_index()
+
+
+def _send_index():
+    # index.html references the current hashed bundles, so browsers must revalidate it.
+    response = send_from_directory(FRONTEND_DIST, "index.html")
+    response.cache_control.no_cache = True
+    return response
 
 
 @app.route("/<path:path>")
@@ -31,13 +56,25 @@ def static_proxy(path):
     If the file doesn't exist, fall back to index.html
     so React Router still works.
     """
-    file_path = os.path.join(FRONTEND_DIST, path)
-    if os.path.isfile(file_path):
-        return send_from_directory(FRONTEND_DIST, path)
-    return send_from_directory(FRONTEND_DIST, "index.html")
+    hashed = path.startswith(HASHED_ASSETS_PREFIX)
+    try:
+        response = send_from_directory(
+            FRONTEND_DIST, path, max_age=HASHED_ASSETS_MAX_AGE if hashed else None
+        )
+    except NotFound:
+        return _send_index()
+    if hashed:
+        response.cache_control.public = True
+        response.cache_control.immutable = True
+    return response
 
 
 # --- API endpoints ---
+@app.errorhandler(RequestEntityTooLarge)
+def upload_too_large(_error):
+    return jsonify({"error": "upload-too-large", "max_mb": MAX_UPLOAD_MB}), 413
+
+
 @app.route("/api/hello")
 def hello():
     return jsonify({"message": "Hello from Python backend!"})
@@ -73,6 +110,22 @@ def extract_text_boxes():
     return jsonify(result), status
 
 
+@app.route("/api/ocr/batch", methods=["POST"])
+def extract_text_boxes_batch():
+    """
+    Accept several uploaded images (field "images"), run OCR on them as one batch,
+    and return bounding boxes per image in upload order.
+    """
+    uploads = request.files.getlist("images")
+    if not uploads:
+        return jsonify({"error": "missing-image"}), 400
+
+    result = read_text_boxes_batch(uploads)
+
+    status = result.pop("status", 200 if result.get("ok") else 500)
+    return jsonify(result), status
+
+
 @app.route("/api/faces", methods=["POST"])
 def extract_faces():
     """
@@ -97,7 +150,14 @@ def extract_faces():
 
 
 def run(host: str = "127.0.0.1", port: int = 5000):
-    app.run(host=host, port=port, debug=False)
+    """
+    Serve the app with waitress (a production WSGI server with a fixed thread pool)
+    when installed, otherwise with Flask's development server.
+    """
+    if waitress_serve is not None:
+        waitress_serve(app, host=host, port=port, threads=WEB_THREADS)
+        return
+    app.run(host=host, port=port, debug=False, threaded=True)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+import os
+import random
+import unittest
+
+from scripts import myregex
+
+# The expectations below are the stdlib engine's; MYREGEX_BACKEND=re2 trades them for linear time.
+RE2_SELECTED = os.environ.get("MYREGEX_BACKEND", "re").strip().lower() == "re2"
+STDLIB_PATTERNS = {
+    "date": myregex.DATE_FIND_REGEXES,
+    "email": [myregex.EMAIL_FIND_REGEX],
+    "iban": [myregex.IBAN_FIND_REGEX],
+    "phone": [myregex.PHONE_FIND_REGEX],
+}
+# Cases where RE2's ASCII-only \b, \d and \s disagree with the stdlib.
+NON_ASCII_CASES = (
+    "jürgen.müller@gmail.com",
+    "ä12.03.2024",
+    "Tel. ٠٦٦٤ ١٢٣٤٥٦٧",
+    "Café 0664 1234567, am 12.03.2024",
+    "IBAN DE89 3704 0044 0532 0130 00 für Müller",
+)
+
+
+def stdlib_spans(text, entity_type):
+    return [(match.span(), match.group(0)) for regex in STDLIB_PATTERNS[entity_type] for match in regex.finditer(text)]
+
+
+def backend_spans(text, entity_type):
+    return [
+        (match.span(), match.group(0))
+        for regex in myregex.ENTITY_FIND_REGEXES[entity_type]
+        for match in regex.finditer(text)
+    ]
+
+
+def random_texts(count, seed, alphabet):
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield "".join(rng.choice(alphabet) for _ in range(rng.randint(1, 40)))
+
+
+ASCII_ALPHABET = list("0123456789") * 3 + list(".-/ ()+@_\n\t") + list("ADEGBOXabcmoz")
+NON_ASCII_ALPHABET = ASCII_ALPHABET + list("éäüßÄ٠١٢٣٦") + [" "]
+
+
+@unittest.skipIf(RE2_SELECTED, "RE2 selected explicitly")
+class DefaultBackendTest(unittest.TestCase):
+    def test_default_scans_match_stdlib_on_non_ascii(self):
+        texts = list(NON_ASCII_CASES) + list(random_texts(5000, 0, NON_ASCII_ALPHABET))
+        for text in texts:
+            for entity_type in STDLIB_PATTERNS:
+                with self.subTest(text=text, entity_type=entity_type):
+                    self.assertEqual(backend_spans(text, entity_type), stdlib_spans(text, entity_type))
+
+    def test_accented_email_is_not_truncated(self):
+        self.assertEqual(myregex.find_matches_for_type("jürgen.müller@gmail.com", "email"), [])
+        self.assertEqual(myregex.find_matches_for_type("ä12.03.2024", "date"), [])
+
+
+@unittest.skipIf(myregex.re2 is None, "google-re2 is not installed")
+class Re2BackendTest(unittest.TestCase):
+    """RE2 is opt-in because it only agrees with the stdlib on ASCII input."""
+
+    def test_re2_matches_stdlib_on_ascii(self):
+        compiled = {
+            entity_type: [
+                myregex.re2.compile("(?i:{})".format(regex.pattern) if entity_type == "email" else regex.pattern)
+                for regex in regexes
+            ]
+            for entity_type, regexes in STDLIB_PATTERNS.items()
+        }
+        for text in random_texts(5000, 1, ASCII_ALPHABET):
+            for entity_type, regexes in compiled.items():
+                with self.subTest(text=text, entity_type=entity_type):
+                    self.assertEqual(
+                        [(match.span(), match.group(0)) for regex in regexes for match in regex.finditer(text)],
+                        stdlib_spans(text, entity_type),
+                    )
+
+
+# Inputs where a single union scan would let one type shadow or swallow another.
+OVERLAP_CASES = (
+    "01.12.34.56.78",
+    "Fax 04-12-1990-55",
+    "01-02-2024-1234567",
+    "12.03.2024@x.com",
+    "a.12.03.2024@x.com",
+    "0664 1234567 12.03.2024",
+    "01.03.2024",
+    "DE89 3704 0044 0532 0130 00",
+    "IBAN DE89 3704 0044 0532 0130 00, Tel. 0664 1234567, am 01.03.2024",
+)
+
+
+def four_pass(text):
+    """The original extract_entities: one finditer per stdlib pattern and type, deduplicated per type."""
+    results = {}
+    for entity_type in ("date", "iban", "phone", "email"):
+        values = []
+        for regex in STDLIB_PATTERNS[entity_type]:
+            for match in regex.finditer(text):
+                result = myregex._build_match(entity_type, match.group(0), match.span())
+                if result is not None:
+                    values.append(result["normalized"])
+        results[entity_type] = list(dict.fromkeys(values))
+    return results
+
+
+def structured_texts(count, seed):
+    rng = random.Random(seed)
+
+    def digits(low, high):
+        return "".join(rng.choice("0123456789") for _ in range(rng.randint(low, high)))
+
+    pieces = (
+        lambda: "{:02d}{}{:02d}{}{}".format(
+            rng.randint(0, 39), rng.choice("./-"), rng.randint(0, 13), rng.choice("./-"),
+            rng.choice([digits(2, 2), str(rng.randint(1900, 2100))]),
+        ),
+        lambda: "{}{}{:02d}{}{:02d}".format(
+            rng.randint(1900, 2100), rng.choice("./-"), rng.randint(1, 12), rng.choice("./-"), rng.randint(1, 31)
+        ),
+        lambda: "0" + digits(2, 4) + rng.choice(["", " ", "-", "."]) + digits(3, 8),
+        lambda: "+" + digits(2, 3) + " " + digits(1, 4) + " " + digits(3, 7),
+        lambda: rng.choice(["ab", "a.b", "x_y", "12", "jürgen"]) + rng.choice(["@", " @ "])
+        + rng.choice(["mail", "x", "müller"]) + rng.choice([".com", ".de", "_at", ". de"]),
+        lambda: rng.choice(["DE", "AT", "GB"]) + digits(2, 2) + " " + " ".join(digits(4, 4) for _ in range(rng.randint(2, 5))),
+        lambda: digits(1, 6),
+        lambda: rng.choice(["Fax", "Tel", "é", "ä", "٠٦٦٤ ١٢٣٤٥٦٧"]),
+    )
+    separators = ("", " ", "-", ".", "@", "/", "x", "  ", "\n", "ä")
+    for _ in range(count):
+        yield "".join(rng.choice(pieces)() + rng.choice(separators) for _ in range(rng.randint(1, 5)))
+
+
+@unittest.skipIf(RE2_SELECTED, "RE2 selected explicitly")
+class ExtractEntitiesTest(unittest.TestCase):
+    def test_overlap_cases_match_four_pass(self):
+        for text in OVERLAP_CASES:
+            with self.subTest(text=text):
+                self.assertEqual(myregex.extract_entities(text), four_pass(text))
+
+    def test_structured_texts_match_four_pass(self):
+        for text in structured_texts(3000, seed=0):
+            with self.subTest(text=text):
+                self.assertEqual(myregex.extract_entities(text), four_pass(text))
+
+    def test_overlapping_types_are_all_reported(self):
+        entities = myregex.extract_entities("Tel 01.12.34.56.78")
+        self.assertEqual((entities["phone"], entities["date"]), (["01.12.34.56.78"], ["01.12.34"]))
+        entities = myregex.extract_entities("01.03.2024")
+        self.assertEqual((entities["phone"], entities["date"]), (["01.03.2024"], ["01.03.2024"]))
+        entities = myregex.extract_entities("DE89 3704 0044 0532 0130 00")
+        self.assertEqual((entities["iban"], entities["phone"]), (["DE89370400440532013000"], ["0044 0532 0130 00"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
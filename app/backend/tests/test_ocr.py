@@ -0,0 +1,188 @@
+import io
+import struct
+import types
+import unittest
+import zlib
+from unittest import mock
+
+from scripts import myregex, ocr
+
+try:
+    import cv2
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    cv2 = None
+    np = None
+
+try:
+    import server
+except ImportError:  # pragma: no cover - optional dependency
+    server = None
+
+
+class StubReader:
+    """Stands in for easyocr.Reader: returns the same detections for every image."""
+
+    def __init__(self, detections):
+        self.detections = detections
+        self.batches = []
+        self.greys = []
+
+    def detect(self, images, reformat=True):
+        self.batches.append(images)
+        return [[] for _ in images], [[] for _ in images]
+
+    def recognize(self, grey, horizontal_list=None, free_list=None, detail=1, reformat=True):
+        self.greys.append(grey)
+        return list(self.detections)
+
+
+class Upload(io.BytesIO):
+    """Minimal werkzeug FileStorage stand-in: truthy and readable."""
+
+    def __bool__(self):
+        return True
+
+
+def png_bytes(height, width):
+    return cv2.imencode(".png", np.full((height, width, 3), 255, np.uint8))[1].tobytes()
+
+
+def oversized_png_bytes(height=50000, width=50000):
+    """A real PNG with its IHDR dimensions rewritten past CV_IO_MAX_IMAGE_PIXELS, so cv2.imdecode raises."""
+    data = bytearray(png_bytes(4, 4))
+    data[16:24] = struct.pack(">II", width, height)
+    data[29:33] = struct.pack(">I", zlib.crc32(bytes(data[12:29])))
+    return bytes(data)
+
+
+@unittest.skipIf(cv2 is None, "OpenCV is not installed")
+class OcrTestCase(unittest.TestCase):
+    detections = ()
+
+    def setUp(self):
+        self.reader = StubReader(self.detections)
+        fake_easyocr = types.SimpleNamespace(Reader=StubReader)
+        for name, value in (("easyocr", fake_easyocr), ("cv2", cv2), ("np", np), ("_reader", self.reader)):
+            patcher = mock.patch.object(ocr, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+
+class ReadTextBoxesBatchTest(OcrTestCase):
+    detections = (([[10, 10], [200, 10], [200, 30], [10, 30]], "john.doe@gmail.com", 0.9),)
+
+    def test_undecodable_upload_fails_only_its_entry(self):
+        with self.assertRaises(cv2.error):
+            cv2.imdecode(np.frombuffer(oversized_png_bytes(), np.uint8), cv2.IMREAD_COLOR)
+
+        uploads = [Upload(png_bytes(50, 60)), Upload(oversized_png_bytes()), Upload(b"junk"), Upload(png_bytes(70, 40))]
+        result = ocr.read_text_boxes_batch(uploads)
+
+        self.assertTrue(result["ok"])
+        self.assertEqual(result["status"], 200)
+        statuses = [(item["status"], item.get("error")) for item in result["results"]]
+        self.assertEqual(statuses, [(200, None), (400, "invalid-image"), (400, "invalid-image"), (200, None)])
+        self.assertEqual(result["results"][0]["boxes"], result["results"][3]["boxes"])
+
+    def test_single_endpoint_rejects_undecodable_upload(self):
+        result = ocr.read_text_boxes(Upload(oversized_png_bytes()))
+        self.assertEqual((result["ok"], result["status"], result["error"]), (False, 400, "invalid-image"))
+
+
+class ReaderInputTest(OcrTestCase):
+    def test_detector_gets_rgb_and_recognizer_gets_bgr_grayscale(self):
+        # Pure red and blue swap places under the wrong channel order, so their luma differs.
+        image = np.zeros((40, 60, 3), np.uint8)
+        image[:, :30] = (0, 0, 255)
+        image[:, 30:] = (255, 0, 0)
+        data = cv2.imencode(".png", image)[1].tobytes()
+
+        self.assertTrue(ocr.read_text_boxes(Upload(data))["ok"])
+
+        decoded = np.frombuffer(data, np.uint8)
+        (batch,) = self.reader.batches
+        np.testing.assert_array_equal(batch[0], cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+        # The baseline handed EasyOCR a file path, which it reads with IMREAD_GRAYSCALE.
+        np.testing.assert_array_equal(self.reader.greys[0], cv2.imdecode(decoded, cv2.IMREAD_GRAYSCALE))
+
+
+# One OCR line per entry, each token as (text, min_x); all tokens of a line share its y band.
+OCR_LINES = (
+    (("01.12.34.56.78", 10),),
+    (("IBAN", 10), ("DE89 3704 0044 0532 0130 00", 60)),
+    (("Tel", 10), ("0664 1234567,", 50), ("john.doe@gmail.com", 200)),
+    (("Geboren", 10), ("12.03.2024", 90)),
+    (("Rechnung 2024-03-12 / +43 664 1234567", 10),),
+)
+
+
+def line_detections():
+    detections = []
+    for row, tokens in enumerate(OCR_LINES):
+        top = 10 + row * 40
+        for text, left in tokens:
+            right = left + 10 * len(text)
+            detections.append(([[left, top], [right, top], [right, top + 20], [left, top + 20]], text, 0.9))
+    return tuple(detections)
+
+
+def per_type_scan():
+    """The boxes endpoint's entities as a separate find_matches_for_type pass per type and line."""
+    expected = []
+    for entity_type in ocr.ENTITY_TYPES:
+        seen = set()
+        for row, tokens in enumerate(OCR_LINES):
+            line_text = " ".join(text for text, _ in tokens)
+            for match in myregex.find_matches_for_type(line_text, entity_type):
+                _, score = myregex.score_entity(entity_type, match["normalized"])
+                if score < ocr.CANDIDATE_MIN_SCORE[entity_type]:
+                    continue
+                key = (ocr.CATEGORY_MAP[entity_type], match["normalized"], 10.0 + row * 40)
+                if key not in seen:
+                    seen.add(key)
+                    expected.append(key)
+    return expected
+
+
+@unittest.skipIf(server is None, "Flask is not installed")
+class BoxesEndpointTest(OcrTestCase):
+    detections = line_detections()
+
+    def setUp(self):
+        super().setUp()
+        self.client = server.app.test_client()
+
+    def post_image(self, path, field="image", count=1):
+        files = [(io.BytesIO(png_bytes(240, 600)), "page.png") for _ in range(count)]
+        response = self.client.post(
+            path,
+            data={field: files if count > 1 else files[0]},
+            content_type="multipart/form-data",
+        )
+        self.assertEqual(response.status_code, 200, response.get_json())
+        return response.get_json()
+
+    @staticmethod
+    def entities(boxes):
+        return [(box["category"], box["text"], box["y"]) for box in boxes]
+
+    def test_boxes_match_per_type_scan(self):
+        boxes = self.post_image("/api/ocr/boxes")["boxes"]
+        self.assertEqual(self.entities(boxes), per_type_scan())
+
+    def test_overlapping_types_are_all_reported(self):
+        found = set(self.entities(self.post_image("/api/ocr/boxes")["boxes"]))
+        # A date-shaped phone keeps both readings; an IBAN keeps its phone-shaped digit run.
+        self.assertIn(("phone-numbers", "01.12.34.56.78", 10.0), found)
+        self.assertIn(("date", "01.12.34", 10.0), found)
+        self.assertIn(("iban", "DE89370400440532013000", 50.0), found)
+        self.assertIn(("phone-numbers", "0044 0532 0130 00", 50.0), found)
+
+    def test_batch_matches_per_type_scan(self):
+        results = self.post_image("/api/ocr/batch", field="images", count=2)["results"]
+        self.assertEqual([self.entities(item["boxes"]) for item in results], [per_type_scan()] * 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -5,6 +5,11 @@ import sys
 import signal
 from shutil import which
 
+try:
+    import psutil
+except ImportError:  # pragma: no cover - optional dependency
+    psutil = None
+
 
 def _ensure_path(path, label):
     if not os.path.exists(path):
@@ -31,6 +36,19 @@ def _terminate_pid(pid):
 
 
 def _collect_listening_pids(port):
+    if psutil is not None:
+        try:
+            return {
+                conn.pid
+                for conn in psutil.net_connections(kind="tcp")
+                if conn.status == psutil.CONN_LISTEN and conn.laddr and conn.laddr.port == port and conn.pid
+            }
+        except (psutil.Error, OSError):
+            pass  # e.g. AccessDenied; fall back to netstat below.
+    return _collect_listening_pids_netstat(port)
+
+
+def _collect_listening_pids_netstat(port):
     try:
         output = subprocess.check_output(
             ["netstat", "-ano", "-p", "tcp"],
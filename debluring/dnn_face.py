@@ -0,0 +1,88 @@
+from __future__ import annotations
+
+import os
+import threading
+from typing import List, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+
+MODELS_DIR = os.path.join(os.path.dirname(__file__), "models")
+DNN_PROTO_PATH = os.environ.get("FACE_DNN_PROTO", os.path.join(MODELS_DIR, "deploy.prototxt"))
+DNN_MODEL_PATH = os.environ.get(
+    "FACE_DNN_MODEL",
+    os.path.join(MODELS_DIR, "res10_300x300_ssd_iter_140000.caffemodel"),
+)
+DNN_INPUT_SIZE = (300, 300)
+DNN_MEAN = (104.0, 177.0, 123.0)
+DNN_MIN_CONFIDENCE = 0.5
+
+_net_lock = threading.Lock()
+_net = None
+_net_checked = False
+
+
+def _cuda_target() -> Optional[int]:
+    """Return the OpenCV DNN CUDA target to use, or None when no CUDA device is usable."""
+    try:
+        if cv2.cuda.getCudaEnabledDeviceCount() <= 0:
+            return None
+        info = cv2.cuda.DeviceInfo(0)
+        # Half precision needs compute capability 5.3 or newer.
+        if (info.majorVersion(), info.minorVersion()) >= (5, 3):
+            return cv2.dnn.DNN_TARGET_CUDA_FP16
+        return cv2.dnn.DNN_TARGET_CUDA
+    except (AttributeError, cv2.error):
+        return None
+
+
+def get_face_net():
+    """
+    Load the OpenCV ResNet-SSD face detector once, on CUDA when available.
+    Returns None when the Caffe model files are missing.
+    """
+    global _net, _net_checked
+    if not _net_checked:
+        with _net_lock:
+            if not _net_checked:
+                if os.path.isfile(DNN_PROTO_PATH) and os.path.isfile(DNN_MODEL_PATH):
+                    net = cv2.dnn.readNetFromCaffe(DNN_PROTO_PATH, DNN_MODEL_PATH)
+                    target = _cuda_target()
+                    if target is not None:
+                        net.setPreferableBackend(cv2.dnn.DNN_BACKEND_CUDA)
+                        net.setPreferableTarget(target)
+                    _net = net
+                _net_checked = True
+    return _net
+
+
+def find_faces_batch(
+    images: Sequence[np.ndarray], min_confidence: float = DNN_MIN_CONFIDENCE
+) -> List[List[Tuple[int, int, int, int]]]:
+    """Detect faces in several BGR images with one forward pass; returns (x, y, w, h) lists per image."""
+    net = get_face_net()
+    if net is None:
+        raise RuntimeError(f"Face detector model not found: {DNN_PROTO_PATH}, {DNN_MODEL_PATH}")
+    if not images:
+        return []
+
+    blob = cv2.dnn.blobFromImages(list(images), 1.0, DNN_INPUT_SIZE, DNN_MEAN)
+    with _net_lock:
+        net.setInput(blob)
+        detections = net.forward()[0, 0]
+
+    # Column 0 is the index of the image a detection belongs to, column 2 its confidence.
+    detections = detections[detections[:, 2] > min_confidence]
+    results: List[List[Tuple[int, int, int, int]]] = []
+    for index, image in enumerate(images):
+        height, width = image.shape[:2]
+        corners = detections[detections[:, 0] == index, 3:7]
+        corners = np.rint(np.clip(corners, 0.0, 1.0) * (width, height, width, height)).astype(int)
+        results.append(
+            [
+                (int(x1), int(y1), int(x2 - x1), int(y2 - y1))
+                for x1, y1, x2, y2 in corners
+                if x2 > x1 and y2 > y1
+            ]
+        )
+    return results
@@ -1,35 +1,75 @@
 from __future__ import annotations
 
+import threading
 from typing import Optional, Tuple
 
 import cv2
+import numpy as np
+
+import dnn_face
+
+CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
+# Detection runs on an image decoded at half resolution (libjpeg DCT scaling),
+# unless that copy would be too small to keep small faces detectable.
+REDUCED_SCALE = 2  # matches the IMREAD_REDUCED_*_2 flags below
+REDUCED_MIN_SIDE = 480
+
+_cascade_lock = threading.Lock()
+_cascade = None
+
+
+def _get_cascade():
+    """Load the frontal-face Haar cascade once and reuse it across calls."""
+    global _cascade
+    if _cascade is None:
+        with _cascade_lock:
+            if _cascade is None:
+                face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
+                if face_cascade.empty():
+                    raise RuntimeError(f"Failed to load Haar cascade: {CASCADE_PATH}")
+                _cascade = face_cascade
+    return _cascade
 
 
 def find_face_position(image_path: str) -> Optional[Tuple[int, int, int, int]]:
-    """Return (x, y, w, h) for the largest detected face, or None if none found."""
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Could not read image: {image_path}")
+    """
+    Return (x, y, w, h) for the largest detected face, or None if none found.
+    Uses the DNN detector from dnn_face when its model files exist, Haar cascades otherwise.
+    """
+    use_dnn = dnn_face.get_face_net() is not None
+    image, scale = _read_reduced(image_path, grayscale=not use_dnn)
 
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    cascade_path = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    face_cascade = cv2.CascadeClassifier(cascade_path)
-    if face_cascade.empty():
-        raise RuntimeError(f"Failed to load Haar cascade: {cascade_path}")
-
-    faces = face_cascade.detectMultiScale(
-        gray,
-        scaleFactor=1.1,
-        minNeighbors=5,
-        minSize=(30, 30),
-    )
+    if use_dnn:
+        faces = np.asarray(dnn_face.find_faces_batch([image])[0], dtype=np.int64).reshape(-1, 4)
+    else:
+        min_side = 30 // scale
+        faces = _get_cascade().detectMultiScale(
+            image,
+            scaleFactor=1.1,
+            minNeighbors=5,
+            minSize=(min_side, min_side),
+        )
     if len(faces) == 0:
         return None
 
-    x, y, w, h = max(faces, key=lambda f: f[2] * f[3])
+    x, y, w, h = faces[int(np.argmax(faces[:, 2] * faces[:, 3]))] * scale
     return int(x), int(y), int(w), int(h)
 
 
+def _read_reduced(image_path: str, grayscale: bool) -> Tuple[np.ndarray, int]:
+    """Decode image_path at 1/REDUCED_SCALE size when large enough; returns (image, scale)."""
+    reduced_flag = cv2.IMREAD_REDUCED_GRAYSCALE_2 if grayscale else cv2.IMREAD_REDUCED_COLOR_2
+    image = cv2.imread(image_path, reduced_flag)
+    if image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    if min(image.shape[:2]) >= REDUCED_MIN_SIDE:
+        return image, REDUCED_SCALE
+    image = cv2.imread(image_path, cv2.IMREAD_GRAYSCALE if grayscale else cv2.IMREAD_COLOR)
+    if image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+    return image, 1
+
+
 if __name__ == "__main__":
     import sys
 
@@ -2,12 +2,67 @@ from __future__ import annotations
 
 import ast
 import os
+import shutil
 import sys
 import urllib.request
-from typing import Callable, Iterable, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Iterable, Optional, Sequence, Tuple
 
 import cv2
 import numpy as np
+from scipy import fft as sp_fft
+
+try:
+    import cupy as cp
+    from cupyx.scipy import fft as cp_fft
+    from cupyx.scipy import ndimage as cp_ndimage
+except ImportError:  # pragma: no cover - optional dependency
+    cp = None
+    cp_fft = None
+    cp_ndimage = None
+
+# Richardson-Lucy stops early once an iteration changes pixels by less than this on average.
+RL_TOLERANCE = 2e-4
+# Threads for the CPU auto sweep; defaults to one per core, RECOVER_WORKERS=1 runs it serially.
+AUTO_WORKERS = max(1, int(os.environ.get("RECOVER_WORKERS", "0") or 0) or (os.cpu_count() or 1))
+# Auto skips the Richardson-Lucy sweep once a cheap candidate is this many times sharper than the input.
+AUTO_SHORTCUT_RATIO = 3.0
+# Upper bound on auto candidates, cheapest first (RECOVER_BUDGET); 0 tries them all.
+AUTO_BUDGET = max(0, int(os.environ.get("RECOVER_BUDGET", "0") or 0))
+
+
+def configure_opencv() -> None:
+    """
+    Make the candidates the unit of parallelism: when the auto sweep runs on a thread
+    pool (AUTO_WORKERS > 1), OpenCV runs single-threaded inside each candidate instead
+    of nesting its own pool. This is a process-wide setting, so the CLI calls it once
+    at startup; library callers decide for themselves.
+    """
+    if AUTO_WORKERS > 1:
+        cv2.setNumThreads(1)
+
+
+def _gpu_available() -> bool:
+    """True when CuPy is installed and sees a CUDA device (RECOVER_FORCE_CPU=1 opts out)."""
+    if cp is None or os.environ.get("RECOVER_FORCE_CPU", "").strip().lower() in {"1", "true", "yes", "on"}:
+        return False
+    try:
+        return cp.cuda.runtime.getDeviceCount() > 0
+    except Exception:  # pragma: no cover - no driver / no device
+        return False
+
+
+def _array_module(arr):
+    """numpy for host arrays, cupy for device arrays."""
+    return np if isinstance(arr, np.ndarray) or cp is None else cp.get_array_module(arr)
+
+
+def _fft_backend(xp):
+    """(fft module, extra kwargs) for arrays of module xp: scipy.fft on all cores, or cupyx.scipy.fft."""
+    if xp is np:
+        return sp_fft, {"workers": -1}
+    return cp_fft, {}
 
 
 def _parse_rect(text: str) -> Tuple[int, int, int, int]:
@@ -26,76 +81,212 @@ def _clamp_rect(x: int, y: int, w: int, h: int, width: int, height: int) -> Tupl
     return x, y, w, h
 
 
-def _gaussian_psf(ksize: int, sigma: float) -> np.ndarray:
+@lru_cache(maxsize=32)
+def _gaussian_kernel_1d(ksize: int, sigma: float) -> np.ndarray:
+    """Normalized 1D Gaussian of length ksize; cached and read-only."""
     ax = np.arange(-(ksize // 2), ksize // 2 + 1, dtype=np.float32)
-    xx, yy = np.meshgrid(ax, ax)
-    psf = np.exp(-(xx**2 + yy**2) / (2.0 * sigma**2))
-    psf /= np.sum(psf)
-    return psf
-
-
-def _wiener_deconvolution(img: np.ndarray, psf: np.ndarray, balance: float) -> np.ndarray:
-    img_f = img.astype(np.float32)
-    psf_f = psf.astype(np.float32)
-    psf_pad = np.zeros_like(img_f)
-    kh, kw = psf_f.shape
-    psf_pad[:kh, :kw] = psf_f
-    psf_pad = np.roll(psf_pad, -kh // 2, axis=0)
-    psf_pad = np.roll(psf_pad, -kw // 2, axis=1)
-
-    img_fft = np.fft.fft2(img_f)
-    psf_fft = np.fft.fft2(psf_pad)
-    psf_fft_conj = np.conj(psf_fft)
-    denom = (np.abs(psf_fft) ** 2) + balance
-    result = np.fft.ifft2(img_fft * psf_fft_conj / denom)
-    return np.clip(np.real(result), 0.0, 1.0)
-
-
-def _richardson_lucy(img: np.ndarray, psf: np.ndarray, iterations: int) -> np.ndarray:
-    img_f = img.astype(np.float32)
-    estimate = np.full_like(img_f, 0.5, dtype=np.float32)
-    psf_flip = psf[::-1, ::-1].astype(np.float32)
+    g = np.exp(-(ax * ax) / (2.0 * sigma * sigma))
+    g /= g.sum()
+    g.setflags(write=False)
+    return g
+
+
+def _fft_shape(img_shape: Tuple[int, int], margin: int = 0) -> Tuple[int, int]:
+    """
+    Smallest 5-smooth size >= img_shape plus margin on every side, so pocketfft stays on its
+    fast radix path. A margin of the PSF radius makes the circular convolution a linear one.
+    """
+    h, w = img_shape
+    return (
+        sp_fft.next_fast_len(h + 2 * margin, real=True),
+        sp_fft.next_fast_len(w + 2 * margin, real=True),
+    )
+
+
+def _precompute_image_fft(img: np.ndarray, margin: int = 0) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (img_f, rfft2(img_f)) so several Wiener deconvolutions can share one image transform.
+    The spectrum is taken over img padded by reflection to _fft_shape(img.shape, margin), with
+    margin rows/columns before it; the ROI starts at (margin, margin) in the padded frame.
+    """
+    xp = _array_module(img)
+    fft_mod, fft_kw = _fft_backend(xp)
+    img_f = img.astype(xp.float32)
+    h, w = img_f.shape
+    fh, fw = _fft_shape((h, w), margin)
+    bottom, right = fh - h - margin, fw - w - margin
+    if xp is np:
+        padded = cv2.copyMakeBorder(img_f, margin, bottom, margin, right, cv2.BORDER_REFLECT)
+    else:
+        # "symmetric" repeats the edge sample, like cv2.BORDER_REFLECT.
+        padded = xp.pad(img_f, ((margin, bottom), (margin, right)), mode="symmetric")
+    return img_f, fft_mod.rfft2(padded, **fft_kw)
+
+
+def _pad_kernel_1d(kernel_1d: np.ndarray, n: int) -> np.ndarray:
+    """Zero-pad kernel_1d to length n with its center moved to index 0 for circular convolution."""
+    padded = np.zeros(n, dtype=np.float32)
+    center = kernel_1d.shape[0] // 2
+    # Taps right of the center (inclusive) start at 0; the left ones wrap to the end.
+    padded[: kernel_1d.shape[0] - center] = kernel_1d[center:]
+    padded[n - center :] = kernel_1d[:center]
+    return padded
+
+
+def _separable_psf_spectra(kernels_1d: Sequence[np.ndarray], fft_shape: Tuple[int, int], xp=np):
+    """
+    rfft2 spectra of the PSFs outer(g, g) for each g in kernels_1d, as an (n, fh, fw // 2 + 1) stack.
+    A separable PSF's 2D transform is the outer product of two 1D transforms, so no 2D FFT is needed.
+    """
+    fft_mod, fft_kw = _fft_backend(xp)
+    fh, fw = fft_shape
+    rows = fft_mod.fft(xp.asarray(np.stack([_pad_kernel_1d(g, fh) for g in kernels_1d])), axis=-1, **fft_kw)
+    cols = fft_mod.rfft(xp.asarray(np.stack([_pad_kernel_1d(g, fw) for g in kernels_1d])), axis=-1, **fft_kw)
+    return rows[:, :, None] * cols[:, None, :]
+
+
+def _wiener_batch(img: np.ndarray, kernels_1d: Sequence[np.ndarray], balance: float) -> np.ndarray:
+    """
+    Wiener-deconvolve img with the separable PSF outer(g, g) for each g in kernels_1d.
+    Returns an (len(kernels_1d), h, w) stack; the image is transformed once for all of them.
+    Runs on the device when img is a CuPy array.
+    """
+    xp = _array_module(img)
+    fft_mod, fft_kw = _fft_backend(xp)
+    # Pad by the widest PSF radius so no candidate's support wraps around the frame.
+    margin = max(g.shape[0] for g in kernels_1d) // 2
+    img_f, img_fft = _precompute_image_fft(img, margin)
+    h, w = img_f.shape
+    fft_shape = _fft_shape((h, w), margin)
+    psf_fft = _separable_psf_spectra(kernels_1d, fft_shape, xp)
+    denom = (xp.abs(psf_fft) ** 2) + balance
+    result = fft_mod.irfft2(img_fft[None] * xp.conj(psf_fft) / denom, s=fft_shape, **fft_kw)
+    return xp.clip(result[:, margin : margin + h, margin : margin + w], 0.0, 1.0)
+
+
+def _wiener_deconvolution(img: np.ndarray, kernel_1d: np.ndarray, balance: float) -> np.ndarray:
+    return _wiener_batch(img, [kernel_1d], balance)[0]
+
+
+def _separable_blur(img: np.ndarray, kernel_1d: np.ndarray, out: np.ndarray) -> np.ndarray:
+    """Convolve with outer(kernel_1d, kernel_1d) as two 1D passes into out, reflecting at the borders."""
+    if isinstance(img, np.ndarray):
+        return cv2.sepFilter2D(img, -1, kernel_1d, kernel_1d, dst=out, borderType=cv2.BORDER_REFLECT)
+    kernel = cp.asarray(kernel_1d)
+    # ndimage "reflect" is cv2.BORDER_REFLECT; the kernel is symmetric, so convolution == correlation.
+    rows = cp_ndimage.convolve1d(img, kernel, axis=1, mode="reflect")
+    return cp_ndimage.convolve1d(rows, kernel, axis=0, output=out, mode="reflect")
+
+
+def _richardson_lucy(
+    img: np.ndarray,
+    kernel_1d: np.ndarray,
+    iterations: int,
+    tol: float = RL_TOLERANCE,
+) -> np.ndarray:
+    """
+    Richardson-Lucy deconvolution for the separable PSF outer(kernel_1d, kernel_1d).
+    Both convolutions run as two 1D passes (2k instead of k*k taps per pixel), and the
+    symmetric Gaussian is its own flip, so the back-projection reuses the same kernel.
+    Stops before `iterations` once one step changes pixels by less than tol on average.
+    All work buffers are allocated once; runs on the device when img is a CuPy array.
+    """
+    xp = _array_module(img)
+    img_f = img.astype(xp.float32)
+    estimate = xp.full_like(img_f, 0.5, dtype=xp.float32)
+    updated = xp.empty_like(estimate)
+    conv = xp.empty_like(estimate)
+    ratio = xp.empty_like(estimate)
 
     for _ in range(iterations):
-        conv = cv2.filter2D(estimate, -1, psf, borderType=cv2.BORDER_REFLECT)
-        conv = np.maximum(conv, 1e-6)
-        relative_blur = img_f / conv
-        estimate *= cv2.filter2D(relative_blur, -1, psf_flip, borderType=cv2.BORDER_REFLECT)
-        estimate = np.clip(estimate, 0.0, 1.0)
+        _separable_blur(estimate, kernel_1d, out=conv)
+        xp.maximum(conv, 1e-6, out=conv)
+        xp.divide(img_f, conv, out=ratio)
+        # conv is free again, so the back-projection reuses it.
+        _separable_blur(ratio, kernel_1d, out=conv)
+        xp.multiply(estimate, conv, out=updated)
+        xp.clip(updated, 0.0, 1.0, out=updated)
+        if xp is np:
+            change = cv2.norm(updated, estimate, cv2.NORM_L1)
+        else:
+            change = float(xp.abs(updated - estimate).sum())
+        estimate, updated = updated, estimate
+        if change < tol * estimate.size:
+            break
 
     return estimate
 
 
 def _unsharp_mask(img: np.ndarray, amount: float, radius: float) -> np.ndarray:
     k = int(max(3, (radius * 4) // 2 * 2 + 1))
-    blurred = cv2.GaussianBlur(img, (k, k), radius)
+    if isinstance(img, np.ndarray):
+        blurred = cv2.GaussianBlur(img, (k, k), radius)
+    else:
+        # Same k x k support as cv2.GaussianBlur; "mirror" is its default BORDER_REFLECT_101.
+        blurred = cp_ndimage.gaussian_filter(img, radius, truncate=(k // 2) / radius, mode="mirror")
     sharpened = img + amount * (img - blurred)
-    return np.clip(sharpened, 0.0, 1.0)
+    return _array_module(img).clip(sharpened, 0.0, 1.0)
 
 
 def _sharpness_score(img: np.ndarray) -> float:
-    img_8 = (img * 255.0).astype(np.uint8)
-    lap = cv2.Laplacian(img_8, cv2.CV_64F)
-    return float(lap.var())
+    """Laplacian variance of a [0, 1] image, in 8-bit units; computed in float32 without a uint8 copy."""
+    if isinstance(img, np.ndarray):
+        lap = cv2.Laplacian(np.asarray(img, dtype=np.float32), cv2.CV_32F)
+    else:
+        # cv2.Laplacian's default 3x3 kernel and BORDER_REFLECT_101 border.
+        lap = cp_ndimage.laplace(img.astype(cp.float32), mode="mirror")
+    return float(lap.var()) * (255.0 * 255.0)
+
+
+def _score_candidate(candidate: Tuple[str, Callable[[], np.ndarray]]) -> Tuple[str, np.ndarray, float]:
+    name, fn = candidate
+    out = fn()
+    return name, out, _sharpness_score(out)
+
+
+def _pick_sharpest(
+    best: Tuple[str, np.ndarray, float],
+    scored: Iterable[Tuple[str, np.ndarray, float]],
+) -> Tuple[str, np.ndarray, float]:
+    for candidate in scored:
+        if candidate[2] > best[2]:
+            best = candidate
+    return best
+
+
+def _run_stage(
+    best: Tuple[str, np.ndarray, float],
+    candidates: Sequence[Tuple[str, Callable[[], np.ndarray]]],
+    workers: int,
+) -> Tuple[str, np.ndarray, float]:
+    if workers <= 1 or len(candidates) <= 1:
+        return _pick_sharpest(best, map(_score_candidate, candidates))
+
+    # OpenCV's own thread count is process-wide, so it is left to configure_opencv().
+    with ThreadPoolExecutor(max_workers=min(workers, len(candidates))) as pool:
+        return _pick_sharpest(best, pool.map(_score_candidate, candidates))
 
 
 def _try_candidates(
     img: np.ndarray,
-    candidates: Iterable[Tuple[str, Callable[[], np.ndarray]]],
+    stages: Sequence[Iterable[Tuple[str, Callable[[], np.ndarray]]]],
+    workers: int = 1,
+    shortcut_ratio: Optional[float] = None,
 ) -> Tuple[str, np.ndarray]:
-    best_name = ""
-    best_img = img
-    best_score = _sharpness_score(img)
-
-    for name, fn in candidates:
-        out = fn()
-        score = _sharpness_score(out)
-        if score > best_score:
-            best_name = name
-            best_img = out
-            best_score = score
-
-    return best_name or "input", best_img
+    """
+    Run the candidates stage by stage and return (name, image) of the sharpest, or ("input", img).
+    With shortcut_ratio set, later stages are skipped once the best score so far exceeds
+    shortcut_ratio times the input's. With workers > 1 each stage runs on a thread pool
+    (OpenCV and pocketfft release the GIL); results are compared in submission order,
+    so the pick matches the serial sweep.
+    """
+    input_score = _sharpness_score(img)
+    best = ("", img, input_score)
+    for stage in stages:
+        if shortcut_ratio is not None and best[0] and best[2] > input_score * shortcut_ratio:
+            break
+        best = _run_stage(best, list(stage), workers)
+    return best[0] or "input", best[1]
 
 
 def _try_gfpgan_restore(
@@ -137,11 +328,16 @@ def _try_gfpgan_restore(
 def _download_file(url: str, dst_path: str) -> None:
     tmp_path = dst_path + ".tmp"
     with urllib.request.urlopen(url) as response, open(tmp_path, "wb") as handle:
-        while True:
-            chunk = response.read(1024 * 1024)
-            if not chunk:
-                break
-            handle.write(chunk)
+        length = int(response.headers.get("Content-Length") or 0)
+        if length and hasattr(os, "posix_fallocate"):
+            # Reserve the whole file up front so the ~340 MB weights land contiguously.
+            try:
+                os.posix_fallocate(handle.fileno(), 0, length)
+            except OSError:
+                pass  # Filesystem without fallocate support; the copy still works.
+        shutil.copyfileobj(response, handle, length=4 * 1024 * 1024)
+        # Drop any preallocated tail if the server sent fewer bytes than announced.
+        handle.truncate()
     os.replace(tmp_path, dst_path)
 
 
@@ -165,25 +361,18 @@ def _ensure_gfpgan_model(model_path: str, strict: bool) -> Optional[str]:
         return None
 
 
-def recover_blurred_region(
-    image_path: str,
+def recover_region_in_memory(
+    image: np.ndarray,
     rect: Tuple[int, int, int, int],
     method: str = "auto",
-) -> str:
-    image = cv2.imread(image_path)
-    if image is None:
-        raise ValueError(f"Could not read image: {image_path}")
-
+) -> np.ndarray:
+    """
+    Recover the (x, y, w, h) rectangle of a decoded BGR image in place and return the image.
+    Callers with several rectangles in one picture can decode it once and call this per rect.
+    """
     h, w = image.shape[:2]
     x, y, rw, rh = _clamp_rect(*rect, width=w, height=h)
 
-    base, ext = os.path.splitext(image_path)
-    out_path = f"{base}_recovered{ext or '.jpg'}"
-
-    roi = image[y : y + rh, x : x + rw]
-    ycrcb = cv2.cvtColor(roi, cv2.COLOR_BGR2YCrCb).astype(np.float32)
-    y_chan = ycrcb[:, :, 0] / 255.0
-
     method = method.lower().strip()
     if method in {"auto", "face", "gfpgan"}:
         restored_full = _try_gfpgan_restore(
@@ -193,41 +382,76 @@ def recover_blurred_region(
         )
         if restored_full is not None:
             image[y : y + rh, x : x + rw] = restored_full[y : y + rh, x : x + rw]
-            cv2.imwrite(out_path, image)
-            return out_path
+            return image
+
+    # Only luma is deconvolved; chroma stays uint8 and is merged back untouched.
+    roi = image[y : y + rh, x : x + rw]
+    y_u8, cr_u8, cb_u8 = cv2.split(cv2.cvtColor(roi, cv2.COLOR_BGR2YCrCb))
+    # One fused pass: uint8 in, float32 out, same values as astype(float32) / 255.
+    y_chan = np.divide(y_u8, np.float32(255.0), dtype=np.float32)
 
     if method == "auto":
-        candidates = []
-        for k in (3, 5, 7, 9, 11):
-            sigma = max(0.6, k / 3.0)
-            psf = _gaussian_psf(k, sigma)
-            candidates.append((f"wiener_k{k}", lambda p=psf: _wiener_deconvolution(y_chan, p, 0.01)))
-        for k in (3, 5, 7, 9):
-            sigma = max(0.6, k / 3.0)
-            psf = _gaussian_psf(k, sigma)
-            for iters in (15, 25):
-                candidates.append(
-                    (f"rl_k{k}_i{iters}", lambda p=psf, i=iters: _richardson_lucy(y_chan, p, i))
-                )
-        candidates.append(("unsharp", lambda: _unsharp_mask(y_chan, amount=1.2, radius=1.3)))
-        _, best = _try_candidates(y_chan, candidates)
-        recovered = best
+        # One host-to-device copy of the channel; every candidate then runs on the GPU.
+        on_gpu = _gpu_available()
+        y_work = cp.asarray(y_chan) if on_gpu else y_chan
+        # Cheapest first: unsharp and the batched Wiener candidates (k=7 leads), then the RL sweep,
+        # which only runs when none of those is already AUTO_SHORTCUT_RATIO times sharper than the input.
+        cheap = [("unsharp", lambda: _unsharp_mask(y_work, amount=1.2, radius=1.3))]
+        wiener_ks = (7, 3, 5, 9, 11)
+        rl_configs = [(k, iters) for k in (3, 5, 7, 9) for iters in (15, 25)]
+        if AUTO_BUDGET:
+            wiener_ks = wiener_ks[: max(0, AUTO_BUDGET - len(cheap))]
+            rl_configs = rl_configs[: max(0, AUTO_BUDGET - len(cheap) - len(wiener_ks))]
+        if wiener_ks:
+            # The Wiener candidates differ only in PSF, so they are computed as one batch.
+            wiener_outs = _wiener_batch(
+                y_work, [_gaussian_kernel_1d(k, max(0.6, k / 3.0)) for k in wiener_ks], 0.01
+            )
+            for k, out in zip(wiener_ks, wiener_outs):
+                cheap.append((f"wiener_k{k}", lambda o=out: o))
+        expensive = []
+        for k, iters in rl_configs:
+            kernel = _gaussian_kernel_1d(k, max(0.6, k / 3.0))
+            expensive.append(
+                (f"rl_k{k}_i{iters}", lambda g=kernel, i=iters: _richardson_lucy(y_work, g, i))
+            )
+        # GPU kernels already queue on one stream, so host threads would only add contention.
+        _, best = _try_candidates(
+            y_work,
+            [cheap, expensive],
+            workers=1 if on_gpu else AUTO_WORKERS,
+            shortcut_ratio=AUTO_SHORTCUT_RATIO,
+        )
+        recovered = best if isinstance(best, np.ndarray) else cp.asnumpy(best)
     elif method == "wiener":
-        psf = _gaussian_psf(7, 2.2)
-        recovered = _wiener_deconvolution(y_chan, psf, 0.01)
+        recovered = _wiener_deconvolution(y_chan, _gaussian_kernel_1d(7, 2.2), 0.01)
     elif method in {"rl", "richardson"}:
-        psf = _gaussian_psf(7, 2.2)
-        recovered = _richardson_lucy(y_chan, psf, 25)
+        recovered = _richardson_lucy(y_chan, _gaussian_kernel_1d(7, 2.2), 25)
     elif method == "unsharp":
         recovered = _unsharp_mask(y_chan, amount=1.2, radius=1.3)
     else:
         raise ValueError("method must be auto, face, gfpgan, wiener, rl, or unsharp")
 
-    ycrcb[:, :, 0] = recovered * 255.0
-    out_roi = cv2.cvtColor(ycrcb.astype(np.uint8), cv2.COLOR_YCrCb2BGR)
+    # Scale, round and saturate back to uint8 in a single OpenCV pass.
+    y_out = cv2.convertScaleAbs(recovered, alpha=255.0)
+    out_roi = cv2.cvtColor(cv2.merge([y_out, cr_u8, cb_u8]), cv2.COLOR_YCrCb2BGR)
     image[y : y + rh, x : x + rw] = out_roi
+    return image
+
+
+def recover_blurred_region(
+    image_path: str,
+    rect: Tuple[int, int, int, int],
+    method: str = "auto",
+) -> str:
+    image = cv2.imread(image_path)
+    if image is None:
+        raise ValueError(f"Could not read image: {image_path}")
+
+    base, ext = os.path.splitext(image_path)
+    out_path = f"{base}_recovered{ext or '.jpg'}"
 
-    cv2.imwrite(out_path, image)
+    cv2.imwrite(out_path, recover_region_in_memory(image, rect, method))
     return out_path
 
 
@@ -240,5 +464,7 @@ if __name__ == "__main__":
     image_path = sys.argv[1]
     rect = _parse_rect(" ".join(sys.argv[2:-1]) if len(sys.argv) > 3 else sys.argv[2])
     method = sys.argv[-1] if len(sys.argv) > 3 else "auto"
+    if method.lower().strip() == "auto":
+        configure_opencv()
     out = recover_blurred_region(image_path, rect, method)
     print(out)